@@ -81,7 +81,7 @@ def convert_call_doc(call_doc):
                     pass
     
     try:
-        return CallResponse(**call_doc)
+        return CallResponse.model_validate(call_doc)
     except Exception as e:
         print(f"[ERROR] Failed to convert call doc: {e}")
         print(f"[ERROR] Call doc: {call_doc}")
@@ -92,7 +92,7 @@ def convert_call_doc(call_doc):
             call_doc["status"] = "scheduled"
             print(f"[ERROR] Fallback to status: 'scheduled'")
             try:
-                return CallResponse(**call_doc)
+                return CallResponse.model_validate(call_doc)
             except Exception as e2:
                 print(f"[ERROR] Even fallback failed: {e2}")
                 raise e
@@ -169,7 +169,7 @@ async def create_call(
     
     # Create call object with user info
     call_db = CallDB(
-        **call.dict(),
+        **call.model_dump(),
         owner_id=current_user.id,
         events=[initial_event]
     )
@@ -183,7 +183,7 @@ async def create_call(
     
     # Insert into database
     calls_collection = MongoDB.get_collection("calls")
-    result = await calls_collection.insert_one(call_db.dict(by_alias=True))
+    result = await calls_collection.insert_one(call_db.model_dump(by_alias=True))
     
     # Get created call
     created_call = await calls_collection.find_one({"_id": result.inserted_id})
@@ -214,17 +214,14 @@ async def create_call(
             
             await calls_collection.update_one(
                 {"_id": result.inserted_id},
-                {
-                    "$push": {"events": whatsapp_event.dict()},
-                    "$set": {
-                        "updated_at": datetime.utcnow(),
-                        "metadata": {
-                            **created_call.get("metadata", {}),
-                            f"whatsapp_{('knowledge_inquiry' if knowledge_base_only else 'survey')}_sent": True,
-                            f"whatsapp_{('knowledge_inquiry' if knowledge_base_only else 'survey')}_time": datetime.utcnow().isoformat()
-                        }
+                CallDB.push_events_update(
+                    [whatsapp_event],
+                    metadata={
+                        **created_call.get("metadata", {}),
+                        f"whatsapp_{('knowledge_inquiry' if knowledge_base_only else 'survey')}_sent": True,
+                        f"whatsapp_{('knowledge_inquiry' if knowledge_base_only else 'survey')}_time": datetime.utcnow().isoformat()
                     }
-                }
+                )
             )
             
             # Re-fetch updated call
@@ -395,7 +392,7 @@ async def update_call(
         )
     
     # Remove None values from update
-    update_data = {k: v for k, v in call_update.dict().items() if v is not None}
+    update_data = {k: v for k, v in call_update.model_dump().items() if v is not None}
     
     # Always update the updated_at timestamp
     update_data["updated_at"] = datetime.utcnow()
@@ -406,12 +403,14 @@ async def update_call(
             event_type=f"status_changed",
             description=f"Status changed from {existing_call['status']} to {update_data['status']}"
         )
-        update_data["events"] = existing_call["events"] + [event.dict()]
+        update = CallDB.push_events_update([event], **update_data)
+    else:
+        update = {"$set": update_data}
     
     # Update call
     await calls_collection.update_one(
         {"_id": ObjectId(call_id)},
-        {"$set": update_data}
+        update
     )
     
     # Get updated call
@@ -503,13 +502,7 @@ async def cancel_call(
     # Update call status
     await calls_collection.update_one(
         {"_id": ObjectId(call_id)},
-        {
-            "$set": {
-                "status": CallStatus.CANCELLED.value,
-                "updated_at": datetime.utcnow()
-            },
-            "$push": {"events": cancel_event.dict()}
-        }
+        CallDB.push_events_update([cancel_event], status=CallStatus.CANCELLED.value)
     )
     
     # Get updated call
@@ -598,25 +591,23 @@ async def start_call(call_id: str, current_user: ClerkUser = Depends(get_current
     now = datetime.utcnow()
     
     # Update call document: set status, record start time and store the WhatsApp message SID
-    update_data = {
-        "$set": {
-            "status": CallStatus.IN_PROGRESS.value, # This status might need adjustment for WhatsApp flow (e.g., AWAITING_USER_REPLY)
-            "started_at": now,
-            "updated_at": now,
-            "metadata": {
-                **existing_call.get("metadata", {}), # Preserve existing metadata
-                "whatsapp_message_sid": whatsapp_response.get("message_sid"),
-                "whatsapp_initiation_status": whatsapp_response.get("status"), # More specific key
-                "whatsapp_template_param1": survey_name,
-                "whatsapp_template_param2": initial_prompt,
-                "communication_type": "whatsapp" # Mark as WhatsApp communication
-            }
-        },
-        "$push": {"events": CallEvent(
+    update_data = CallDB.push_events_update(
+        [CallEvent(
             event_type="survey_initiated_whatsapp",
             description=f"Survey initiated via WhatsApp to {existing_call['phone_number']} using template. Param1='{survey_name}', Param2='{initial_prompt}'."
-        ).dict()}
-    }
+        )],
+        status=CallStatus.IN_PROGRESS.value, # This status might need adjustment for WhatsApp flow (e.g., AWAITING_USER_REPLY)
+        started_at=now,
+        updated_at=now,
+        metadata={
+            **existing_call.get("metadata", {}), # Preserve existing metadata
+            "whatsapp_message_sid": whatsapp_response.get("message_sid"),
+            "whatsapp_initiation_status": whatsapp_response.get("status"), # More specific key
+            "whatsapp_template_param1": survey_name,
+            "whatsapp_template_param2": initial_prompt,
+            "communication_type": "whatsapp" # Mark as WhatsApp communication
+        }
+    )
     
     # For backward compatibility, if twilio_call_sid is used generically for message SIDs
     if whatsapp_response.get("success") and whatsapp_response.get("message_sid"):
@@ -699,22 +690,20 @@ async def send_whatsapp_reminder(
     now = datetime.utcnow()
     
     # Update call document with WhatsApp message information
-    update_data = {
-        "$set": {
-            "updated_at": now,
-            "metadata": {
-                **existing_call.get("metadata", {}),
-                "whatsapp_message_sid": whatsapp_response.get("message_sid"),
-                "whatsapp_status": whatsapp_response.get("status"),
-                "appointment_date": appointment_date,
-                "appointment_time": appointment_time
-            }
-        },
-        "$push": {"events": CallEvent(
+    update_data = CallDB.push_events_update(
+        [CallEvent(
             event_type="whatsapp_reminder_sent",
             description=f"WhatsApp appointment reminder sent to {existing_call['phone_number']} for {appointment_date} at {appointment_time}"
-        ).dict()}
-    }
+        )],
+        updated_at=now,
+        metadata={
+            **existing_call.get("metadata", {}),
+            "whatsapp_message_sid": whatsapp_response.get("message_sid"),
+            "whatsapp_status": whatsapp_response.get("status"),
+            "appointment_date": appointment_date,
+            "appointment_time": appointment_time
+        }
+    )
     
     await calls_collection.update_one(
         {"_id": ObjectId(call_id)},
@@ -868,17 +857,14 @@ async def send_whatsapp_survey(
             description=f"WhatsApp survey sent to {existing_call['phone_number']}"
         )
         
-        update_data = {
-            "$push": {"events": whatsapp_event.dict()},
-            "$set": {
-                "updated_at": datetime.utcnow(),
-                "metadata": {
-                    **existing_call.get("metadata", {}),
-                    "whatsapp_survey_sent": True,
-                    "whatsapp_survey_time": datetime.utcnow().isoformat()
-                }
+        update_data = CallDB.push_events_update(
+            [whatsapp_event],
+            metadata={
+                **existing_call.get("metadata", {}),
+                "whatsapp_survey_sent": True,
+                "whatsapp_survey_time": datetime.utcnow().isoformat()
             }
-        }
+        )
         
         await calls_collection.update_one(
             {"_id": ObjectId(call_id)},
@@ -922,7 +908,7 @@ async def send_whatsapp_survey_internal(call_id: str, user_id: str, survey: dict
     
     # Store survey result
     results_collection = MongoDB.get_collection("survey_results")
-    result = await results_collection.insert_one(survey_result.dict(by_alias=True))
+    result = await results_collection.insert_one(survey_result.model_dump(by_alias=True))
     survey_result_id = str(result.inserted_id)
     
     # Prepare WhatsApp message
@@ -1051,13 +1037,7 @@ Reply with your answer."""
     
     await calls_collection.update_one(
         {"_id": ObjectId(call_id)},
-        {
-            "$push": {"events": whatsapp_event.dict()},
-            "$set": {
-                "updated_at": datetime.utcnow(),
-                "metadata": updated_metadata
-            }
-        }
+        CallDB.push_events_update([whatsapp_event], metadata=updated_metadata)
     )
     
     logger.info(f"WhatsApp survey started for call {call_id}, survey result {survey_result_id}")
@@ -1128,7 +1108,7 @@ async def add_duration_data_debug(
         
         # Add duration data to calls that don't have survey results
         import random
-        created_count = 0
+        new_survey_results = []
         updated_count = 0
         
         for call in calls[:5]:  # Process first 5 calls
@@ -1175,8 +1155,13 @@ async def add_duration_data_debug(
                     'updated_at': datetime.utcnow()
                 }
                 
-                await survey_results_collection.insert_one(survey_result)
-                created_count += 1
+                new_survey_results.append(survey_result)
+        
+        # Insert new survey results in a single round-trip
+        created_count = 0
+        if new_survey_results:
+            insert_result = await survey_results_collection.insert_many(new_survey_results, ordered=False)
+            created_count = len(insert_result.inserted_ids)
         
         # Test the updated stats
         stats = await get_call_stats_internal(current_user)
@@ -1198,27 +1183,22 @@ async def add_duration_data_debug(
 async def get_call_stats_internal(current_user):
     """Internal function to get call stats"""
     survey_results_collection = MongoDB.get_collection("survey_results")
+    calls_collection = MongoDB.get_collection("calls")
+    
+    # Resolve the user's call ids first so the pipeline only scans their survey results
+    call_object_ids = [
+        call["_id"] async for call in calls_collection.find({"owner_id": current_user.id}, {"_id": 1})
+    ]
+    call_ids = [str(call_id) for call_id in call_object_ids]
     
     # Calculate average duration for completed calls using survey_results data
+    # (call_id may be stored either as a string or as an ObjectId)
     duration_pipeline = [
-        {"$addFields": {
-            "call_id_obj": {
-                "$cond": {
-                    "if": {"$type": "$call_id"} == "string",
-                    "then": {"$toObjectId": "$call_id"},
-                    "else": "$call_id"
-                }
-            }
-        }},
-        {"$lookup": {
-            "from": "calls",
-            "localField": "call_id_obj", 
-            "foreignField": "_id",
-            "as": "call_info",
-            "pipeline": [{"$match": {"owner_id": current_user.id}}]
-        }},
         {"$match": {
-            "call_info": {"$ne": []},
+            "$or": [
+                {"call_id": {"$in": call_ids}},
+                {"call_id": {"$in": call_object_ids}}
+            ],
             "duration_seconds": {"$exists": True, "$ne": None, "$gt": 0}
         }},
         {"$group": {
@@ -1365,13 +1345,7 @@ Reply to this message with your question and I'll provide detailed information f
         
         await calls_collection.update_one(
             {"_id": ObjectId(call_id)},
-            {
-                "$push": {"events": whatsapp_event.dict()},
-                "$set": {
-                    "updated_at": datetime.utcnow(),
-                    "metadata": updated_metadata
-                }
-            }
+            CallDB.push_events_update([whatsapp_event], metadata=updated_metadata)
         )
         
     except Exception as e:
@@ -1431,14 +1405,14 @@ async def create_knowledge_inquiry(
     
     # Create call object
     call_db = CallDB(
-        **call_data.dict(),
+        **call_data.model_dump(),
         owner_id=current_user.id,
         events=[initial_event]
     )
     
     # Insert into database
     calls_collection = MongoDB.get_collection("calls")
-    result = await calls_collection.insert_one(call_db.dict(by_alias=True))
+    result = await calls_collection.insert_one(call_db.model_dump(by_alias=True))
     
     # Get created call
     created_call = await calls_collection.find_one({"_id": result.inserted_id})
@@ -1458,13 +1432,10 @@ async def create_knowledge_inquiry(
             # Update with error info
             await calls_collection.update_one(
                 {"_id": result.inserted_id},
-                {
-                    "$push": {"events": CallEvent(
-                        event_type="whatsapp_send_failed",
-                        description=f"Failed to send WhatsApp message: {str(e)}"
-                    ).dict()},
-                    "$set": {"updated_at": datetime.utcnow()}
-                }
+                CallDB.push_events_update([CallEvent(
+                    event_type="whatsapp_send_failed",
+                    description=f"Failed to send WhatsApp message: {str(e)}"
+                )])
             )
     
     logger.info(f"Knowledge base inquiry scheduled with ID: {result.inserted_id}", 
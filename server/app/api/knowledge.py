@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import os
 import shutil
 from pathlib import Path
 from bson import ObjectId
+import orjson
 
 from ..core.security import get_current_user, ClerkUser
 from ..core.logging import get_logger
@@ -35,7 +36,7 @@ def convert_document_doc(doc):
         return None
     
     doc["id"] = str(doc.pop("_id"))
-    return DocumentResponse(**doc)
+    return DocumentResponse.model_validate(doc)
 
 # Create upload directory if it doesn't exist
 UPLOAD_DIR = Path("uploads")
@@ -92,7 +93,7 @@ async def process_document(document_id: str, file_path: str, owner_id: str):
             }
             chunk_metadatas.append(chunk_metadata)
         
-        vector_db.add_texts(
+        await vector_db.add_texts(
             collection_name=vector_collection_name,
             texts=chunk_texts,
             embeddings=embeddings,
@@ -171,7 +172,7 @@ async def upload_document(
     
     # Insert into database
     documents_collection = MongoDB.get_collection("documents")
-    result = await documents_collection.insert_one(document_db.dict(by_alias=True))
+    result = await documents_collection.insert_one(document_db.model_dump(by_alias=True))
     document_id = str(result.inserted_id)
     
     # Save file
@@ -319,7 +320,7 @@ async def update_document(
         )
     
     # Remove None values from update
-    update_data = {k: v for k, v in document_update.dict().items() if v is not None}
+    update_data = {k: v for k, v in document_update.model_dump().items() if v is not None}
     
     # Always update the updated_at timestamp
     update_data["updated_at"] = datetime.utcnow()
@@ -405,11 +406,14 @@ async def search_knowledge_base(
     embedding_generator = EmbeddingGenerator()
     query_embedding = embedding_generator.generate_embeddings([query.query])[0]
     
-    # Get user's documents
-    user_docs = await documents_collection.find({
-        "owner_id": current_user.id,
-        "status": DocumentStatus.PROCESSED.value
-    }).to_list(length=100)
+    # Get user's documents (only the fields needed to search and label results)
+    user_docs = await documents_collection.find(
+        {
+            "owner_id": current_user.id,
+            "status": DocumentStatus.PROCESSED.value
+        },
+        {"name": 1, "vector_collection_name": 1}
+    ).to_list(length=100)
     
     if not user_docs:
         return []
@@ -452,4 +456,55 @@ async def search_knowledge_base(
     all_results.sort(key=lambda x: x.score, reverse=True)
     
     # Return top results
-    return all_results[:query.top_k]
\ No newline at end of file
+    return all_results[:query.top_k]
+
+@router.post("/search/stream")
+async def stream_search_knowledge_base(
+    query: SearchQuery,
+    current_user: ClerkUser = Depends(get_current_user)
+):
+    """
+    Search the knowledge base, streaming results as NDJSON.
+    Results are streamed per document as they are found (up to top_k each), unsorted.
+    """
+    documents_collection = MongoDB.get_collection("documents")
+    
+    # Generate embedding for query
+    embedding_generator = EmbeddingGenerator()
+    query_embedding = embedding_generator.generate_embeddings([query.query])[0]
+    
+    # Get user's documents (only the fields needed to search and label results)
+    user_docs = await documents_collection.find(
+        {
+            "owner_id": current_user.id,
+            "status": DocumentStatus.PROCESSED.value
+        },
+        {"name": 1, "vector_collection_name": 1}
+    ).to_list(length=100)
+    
+    vector_db = VectorDB()
+    
+    def generate_results():
+        for doc in user_docs:
+            vector_collection_name = doc.get("vector_collection_name")
+            if not vector_collection_name:
+                continue
+            
+            try:
+                for result in vector_db.similarity_search_iter(
+                    collection_name=vector_collection_name,
+                    query_embedding=query_embedding,
+                    top_k=query.top_k
+                ):
+                    yield orjson.dumps({
+                        "id": result["id"],
+                        "document_id": str(doc["_id"]),
+                        "document_name": doc["name"],
+                        "content": result["text"],
+                        "score": result["score"],
+                        "metadata": result["metadata"]
+                    }, default=str) + b"\n"
+            except Exception as e:
+                logger.error(f"Error searching vector collection: {str(e)}", exc_info=True)
+    
+    return StreamingResponse(generate_results(), media_type="application/x-ndjson")
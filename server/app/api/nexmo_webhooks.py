@@ -13,7 +13,8 @@ from ..core.logging import get_logger
 from ..db.mongodb import MongoDB
 from ..services.nexmo_whatsapp_service import NexmoWhatsAppService
 from ..services.sentiment.analyzer import SentimentAnalyzer
-from ..services.llm.cot_engine import CoTEngine
+from ..services.llm.cot_engine import get_cot_engine
+from ..models.call import CallDB, CallEvent
 from ..models.survey import SurveyResult
 
 logger = get_logger("api.nexmo_webhooks")
@@ -359,8 +360,7 @@ Keep your response:
 Response:"""
         
         # Generate response using CoT engine
-        cot_engine = CoTEngine()
-        ai_response = await cot_engine.generate(response_prompt)
+        ai_response = await get_cot_engine().generate(response_prompt)
         
         if ai_response:
             # Add sources information
@@ -420,25 +420,21 @@ async def log_knowledge_interaction(call_id: str, query: str, response: str, sta
     try:
         calls_collection = MongoDB.get_collection("calls")
         
-        interaction_event = {
-            "event_type": "knowledge_base_interaction",
-            "description": f"User query: {query[:100]}{'...' if len(query) > 100 else ''}",
-            "timestamp": datetime.utcnow(),
-            "metadata": {
+        interaction_event = CallEvent(
+            event_type="knowledge_base_interaction",
+            description=f"User query: {query[:100]}{'...' if len(query) > 100 else ''}",
+            metadata={
                 "query": query,
                 "response": response,
                 "status": status,
                 "tokens_used": tokens_used,
                 "response_length": len(response)
             }
-        }
+        )
         
         await calls_collection.update_one(
             {"_id": ObjectId(call_id)},
-            {
-                "$push": {"events": interaction_event},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
+            CallDB.push_events_update([interaction_event])
         )
         
         logger.info(f"📝 Logged knowledge interaction for call {call_id}")
@@ -13,7 +13,8 @@ from ..models.survey import (
     SurveyResponse, 
     SurveyDB,
     SurveyStatus,
-    SurveyResult
+    SurveyResult,
+    QUESTIONS_ADAPTER
 )
 
 logger = get_logger("api.surveys")
@@ -26,7 +27,9 @@ def convert_survey_doc(survey_doc):
         return None
     
     survey_doc["id"] = str(survey_doc.pop("_id"))
-    return SurveyResponse(**survey_doc)
+    # Stored surveys are trusted: only the nested questions are validated, with a prebuilt adapter
+    survey_doc["questions"] = QUESTIONS_ADAPTER.validate_python(survey_doc.get("questions", []))
+    return SurveyResponse.model_construct(**survey_doc)
 
 # Endpoints
 @router.post("/", response_model=SurveyResponse, status_code=status.HTTP_201_CREATED)
@@ -37,13 +40,13 @@ async def create_survey(
     """Create a new survey"""
     # Create survey object with user info
     survey_db = SurveyDB(
-        **survey.dict(),
+        **survey.model_dump(),
         owner_id=current_user.id
     )
     
     # Insert into database
     surveys_collection = MongoDB.get_collection("surveys")
-    result = await surveys_collection.insert_one(survey_db.dict(by_alias=True))
+    result = await surveys_collection.insert_one(survey_db.model_dump(by_alias=True))
     
     # Get created survey
     created_survey = await surveys_collection.find_one({"_id": result.inserted_id})
@@ -138,7 +141,7 @@ async def update_survey(
         )
     
     # Remove None values from update
-    update_data = {k: v for k, v in survey_update.dict().items() if v is not None}
+    update_data = {k: v for k, v in survey_update.model_dump().items() if v is not None}
     
     # Always update the updated_at timestamp
     update_data["updated_at"] = datetime.utcnow()
@@ -262,9 +265,9 @@ async def get_survey_results(
     cursor = results_collection.find({"survey_id": survey_id}).skip(skip).limit(limit)
     results = await cursor.to_list(length=limit)
     
-    # Convert results
+    # Convert results (documents come from our own collection, so skip re-validation)
     return [
-        SurveyResult(**{**result, "id": str(result["_id"])})
+        SurveyResult.model_construct(**{**result, "id": str(result["_id"])})
         for result in results
     ]
 
@@ -101,7 +101,7 @@ async def test_send_whatsapp_survey(request: WhatsAppTestRequest):
             # Store in database
             survey_results_collection = MongoDB.get_collection("survey_results")
             survey_result_doc = await survey_results_collection.insert_one(
-                survey_result.dict(by_alias=True)
+                survey_result.model_dump(by_alias=True)
             )
             
             logger.info(f"✅ Test WhatsApp survey sent to {request.phone_number}")
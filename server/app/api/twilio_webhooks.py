@@ -11,7 +11,7 @@ from typing import Dict, Any, Optional, List
 from ..core.config import get_settings
 from ..core.logging import get_logger
 from ..db.mongodb import MongoDB
-from ..models.call import CallEvent, CallStatus
+from ..models.call import CallDB, CallEvent, CallStatus
 from ..services.llm.orchestrator import LLMOrchestrator
 from ..services.telephony.twilio_connector import TwilioConnector
 from ..services.telephony.speech_to_text import STTService
@@ -243,18 +243,16 @@ async def twilio_gather_webhook(form_data: Dict[str, Any] = Depends(validate_twi
             duration = (now - call["started_at"]).total_seconds() if call.get("started_at") else None
             await calls_collection.update_one(
                 {"twilio_call_sid": call_sid},
-                {
-                    "$set": {
-                        "status": CallStatus.COMPLETED.value,
-                        "ended_at": now,
-                        "duration_seconds": duration,
-                        "updated_at": now
-                    },
-                    "$push": {"events": CallEvent(
+                CallDB.push_events_update(
+                    [CallEvent(
                         event_type="completed",
                         description="Survey completed successfully"
-                    ).dict()}
-                }
+                    )],
+                    status=CallStatus.COMPLETED.value,
+                    ended_at=now,
+                    duration_seconds=duration,
+                    updated_at=now
+                )
             )
             return Response(content=twiml, media_type="application/xml")
         
@@ -282,7 +280,7 @@ async def twilio_gather_webhook(form_data: Dict[str, Any] = Depends(validate_twi
                 start_time=call.get("started_at", datetime.utcnow()),
                 responses={question["id"]: response_value}
             )
-            result_id = await results_collection.insert_one(result_doc.dict(by_alias=True))
+            result_id = await results_collection.insert_one(result_doc.model_dump(by_alias=True))
             await calls_collection.update_one(
                 {"_id": call["_id"]},
                 {"$set": {"survey_result_id": str(result_id.inserted_id)}}
@@ -437,10 +435,7 @@ async def twilio_status_callback(form_data: Dict[str, Any] = Depends(validate_tw
         # Update call
         await calls_collection.update_one(
             {"twilio_call_sid": call_sid},
-            {
-                "$set": update_data,
-                "$push": {"events": event.dict()}
-            }
+            CallDB.push_events_update([event], **update_data)
         )
         
         return JSONResponse({"status": "success", "message": "Call status updated"})
@@ -507,12 +502,10 @@ async def twilio_recording_callback(form_data: Dict[str, Any] = Depends(validate
                 # Add an event for the transcription
                 await calls_collection.update_one(
                     {"twilio_call_sid": call_sid},
-                    {
-                        "$push": {"events": CallEvent(
-                            event_type="transcription_completed",
-                            description="Call recording transcribed successfully"
-                        ).dict()}
-                    }
+                    CallDB.push_events_update([CallEvent(
+                        event_type="transcription_completed",
+                        description="Call recording transcribed successfully"
+                    )])
                 )
             except Exception as e:
                 logger.error(f"Failed to transcribe recording: {str(e)}", exc_info=True)
@@ -521,16 +514,13 @@ async def twilio_recording_callback(form_data: Dict[str, Any] = Depends(validate
         # Update call with recording info
         await calls_collection.update_one(
             {"twilio_call_sid": call_sid},
-            {
-                "$set": {
-                    "metadata.recording": recording_info,
-                    "updated_at": datetime.utcnow()
-                },
-                "$push": {"events": CallEvent(
+            CallDB.push_events_update(
+                [CallEvent(
                     event_type="recording_received",
                     description=f"Recording received with status: {recording_status}"
-                ).dict()}
-            }
+                )],
+                **{"metadata.recording": recording_info}
+            )
         )
         
         return JSONResponse({
@@ -1,20 +1,29 @@
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 from typing import Optional, List
 from pathlib import Path
-from dotenv import load_dotenv
 from pydantic import field_validator
 
-# Charger automatiquement server/.env au démarrage
-load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env", override=True)
+# Fichier server/.env lu par Settings
+ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_file=ENV_PATH,
+        env_file_encoding="utf-8",
+        extra="ignore",
+        case_sensitive=True
+    )
+
     # Server Configuration
     API_HOST: str
     API_PORT: int
     DEBUG: bool
     ENVIRONMENT: str
 
+    # Logging (keep 1 in N DEBUG records on app_logger)
+    LOG_SAMPLE_RATE: Optional[int] = None
+
     # WhatsApp Testing
     WHATSAPP_SIMULATION_MODE: bool
 
@@ -29,15 +38,38 @@ class Settings(BaseSettings):
 
     # Vector Database
     QDRANT_URL: Optional[str] = None
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_PREFER_GRPC: bool = True
+    QDRANT_SCALAR_QUANTIZATION: bool = True
     PINECONE_API_KEY: Optional[str] = None
     PINECONE_ENVIRONMENT: Optional[str] = None
     VECTOR_DB_TYPE: str
+    VECTOR_DB_UPSERT_BATCH_SIZE: int = 64
+    VECTOR_DB_UPSERT_CONCURRENCY: int = 4
 
     # LLM Provider
     OPENAI_API_KEY: Optional[str] = None
     ANTHROPIC_API_KEY: Optional[str] = None
     LLM_PROVIDER: str
+    LLM_MAX_CONNECTIONS: int = 200
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    LLM_MAX_RETRIES: int = 3
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_REQUESTS_PER_MINUTE: int = 0  # 0 disables client-side rate limiting
+    LLM_RESPONSE_CACHE_SIZE: int = 1024
+    LLM_RESPONSE_CACHE_TTL_SECONDS: int = 3600
+    LLM_SEMANTIC_CACHE_ENABLED: bool = False
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    LLM_REASONING_CACHE_ENABLED: bool = False
+    LLM_REASONING_CACHE_THRESHOLD: float = 0.92
+    LLM_REASONING_CACHE_TTL_SECONDS: int = 3600
+    LLM_NATIVE_STRUCTURED_OUTPUT: bool = True
+    OPENAI_STRICT_JSON_SCHEMA: bool = False  # Needs a model with Structured Outputs (gpt-4o-2024-08-06 or later)
     EMBEDDING_MODEL: str
+    OLLAMA_BASE_URL: str = "http://localhost:11434"
+    EMBEDDING_CACHE_SIZE: int = 10000
+    RAG_QUERY_BATCH_WINDOW_MS: int = 10  # Concurrent retrieval queries within this window share one embedding call
+    RAG_QUERY_BATCH_SIZE: int = 32
 
     # Twilio
     TWILIO_ACCOUNT_SID: str
@@ -46,6 +78,7 @@ class Settings(BaseSettings):
     TWILIO_WEBHOOK_URL: str
     TWILIO_STATUS_CALLBACK_URL: str
     TWILIO_RECORDING_CALLBACK_URL: str
+    WEBHOOK_BASE_URL: str = "https://your-ngrok-url.ngrok.io"
 
     # Twilio WhatsApp Settings
     TWILIO_WHATSAPP_FROM: str
@@ -57,6 +90,7 @@ class Settings(BaseSettings):
     NEXMO_WHATSAPP_FROM: str
     NEXMO_WEBHOOK_URL: str
     NEXMO_STATUS_WEBHOOK_URL: str
+    NEXMO_MESSAGES_API_URL: str = "https://messages-sandbox.nexmo.com/v1/messages"
 
     # Speech Services
     DEEPGRAM_API_KEY: Optional[str] = None
@@ -73,6 +107,7 @@ class Settings(BaseSettings):
     # Clerk configuration
     CLERK_INSTANCE_ID: str
     CLERK_SECRET_KEY: str
+    CLERK_INSTANCE: str = "your-clerk-instance"
 
     @field_validator("OPENAI_API_KEY")
     @classmethod
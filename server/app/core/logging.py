@@ -1,11 +1,21 @@
 import logging
+import logging.handlers
+import atexit
+import itertools
 import json
+import queue
 import sys
+import time
 import traceback
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Any
 
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder
+    orjson = None
+
 from .config import get_settings
 
 settings = get_settings()
@@ -14,40 +24,122 @@ settings = get_settings()
 log_dir = Path("logs")
 log_dir.mkdir(exist_ok=True)
 
+# Standard LogRecord attributes, excluded from the JSON extras
+_RESERVED_LOGRECORD_ATTRS = frozenset({
+    "args", "asctime", "created", "exc_info", "exc_text", "filename",
+    "funcName", "id", "levelname", "levelno", "lineno", "module",
+    "msecs", "message", "msg", "name", "pathname", "process",
+    "processName", "relativeCreated", "stack_info", "taskName",
+    "thread", "threadName"
+})
+
+# Buffered file handlers by logger name, flushed on shutdown
+_buffered_handlers = {}
+
+# Background listeners that run the real handlers, stopped on shutdown
+_queue_listeners = []
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that passes records through unchanged so the
+    JSON formatter still sees args and exc_info on the worker thread.
+    """
+    def prepare(self, record):
+        return record
+
 # Configure logging
 class JsonFormatter(logging.Formatter):
     """
     Formatter that outputs JSON strings after parsing the log record.
     """
     def format(self, record):
+        attrs = record.__dict__
+        
+        # Extra fields passed to the logging call
+        extras = {key: attrs[key] for key in attrs.keys() - _RESERVED_LOGRECORD_ATTRS}
+        
+        # Plain records only need the variable fields serialized
+        if orjson is not None and not extras and not record.exc_info:
+            return self._format_plain(record)
+        
         log_record = {
-            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc),
             "level": record.levelname,
             "message": record.getMessage(),
             "module": record.module,
             "function": record.funcName,
-            "line": record.lineno
+            "line": record.lineno,
+            **extras
         }
         
         # Add exception info if available
-        if record.exc_info:
+        if record.exc_info and record.exc_info[0] is not None:
             log_record["exception"] = {
                 "type": record.exc_info[0].__name__,
                 "message": str(record.exc_info[1]),
-                "traceback": traceback.format_exception(*record.exc_info)
+                "traceback": "".join(traceback.format_exception(*record.exc_info))
             }
             
-        # Add extra fields from the record
-        for key, value in record.__dict__.items():
-            if key not in {
-                "args", "asctime", "created", "exc_info", "exc_text", "filename",
-                "funcName", "id", "levelname", "levelno", "lineno", "module",
-                "msecs", "message", "msg", "name", "pathname", "process",
-                "processName", "relativeCreated", "stack_info", "thread", "threadName"
-            }:
-                log_record[key] = value
-                
-        return json.dumps(log_record)
+        if orjson is not None:
+            return orjson.dumps(log_record, default=str, option=orjson.OPT_UTC_Z).decode()
+        
+        log_record["timestamp"] = log_record["timestamp"].isoformat()
+        return json.dumps(log_record, default=str)
+    
+    def _format_plain(self, record):
+        """
+        Format a record without extras or exception info, splicing the
+        variable fields into pre-serialized level fragments.
+        """
+        level_fragment = _LEVEL_FRAGMENTS.get(record.levelname)
+        if level_fragment is None:
+            level_fragment = _level_fragment(record.levelname)
+        
+        timestamp = orjson.dumps(
+            datetime.fromtimestamp(record.created, tz=timezone.utc),
+            option=orjson.OPT_UTC_Z
+        )
+        fields = orjson.dumps({
+            "message": record.getMessage(),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno
+        }, default=str)
+        
+        return (b'{"timestamp":' + timestamp + level_fragment + fields[1:]).decode()
+
+def _level_fragment(levelname: str) -> bytes:
+    """
+    Pre-serialize the level field that follows the timestamp.
+    """
+    return b',"level":' + orjson.dumps(levelname) + b','
+
+# Level fragments for the standard levels
+_LEVEL_FRAGMENTS = {
+    logging.getLevelName(level): _level_fragment(logging.getLevelName(level))
+    for level in (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL)
+} if orjson is not None else {}
+
+class SamplingFilter(logging.Filter):
+    """
+    Filter that keeps one in every `rate` DEBUG records.
+    Records above DEBUG always pass.
+    """
+    def __init__(self, rate: int = 1):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._counter = itertools.count(1)
+    
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate == 1:
+            return True
+        return next(self._counter) % self.rate == 0
+
+# Formatters shared by all loggers
+_JSON_FORMATTER = JsonFormatter()
+_CONSOLE_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
 
 def setup_logger(name: str, level=None):
     """
@@ -59,34 +151,78 @@ def setup_logger(name: str, level=None):
     logger = logging.getLogger(name)
     logger.setLevel(level)
     
+    # Handlers are attached once per logger name
+    if name in _buffered_handlers:
+        return logger
+    
     # Clear existing handlers
     logger.handlers = []
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(_CONSOLE_FORMATTER)
     
-    # File handler (JSON)
+    # File handler (JSON), buffered so records are written in batches.
+    # ERROR and above flush the buffer immediately.
     file_handler = logging.FileHandler(log_dir / f"{name.replace('.', '_')}.log")
-    file_handler.setFormatter(JsonFormatter())
-    logger.addHandler(file_handler)
+    file_handler.setFormatter(_JSON_FORMATTER)
+    memory_handler = logging.handlers.MemoryHandler(
+        capacity=512,
+        flushLevel=logging.ERROR,
+        target=file_handler,
+        flushOnClose=True
+    )
+    _buffered_handlers[name] = memory_handler
+    
+    # The logger only enqueues records; a listener thread does the I/O
+    log_queue = queue.Queue(-1)
+    logger.addHandler(_InProcessQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, console_handler, memory_handler)
+    listener.start()
+    _queue_listeners.append(listener)
     
     return logger
 
+def flush_loggers():
+    """
+    Drain the log queues and flush all buffered file handlers to disk.
+    """
+    while _queue_listeners:
+        _queue_listeners.pop().stop()
+    for handler in _buffered_handlers.values():
+        handler.flush()
+    _access_log_file.flush()
+
+atexit.register(flush_loggers)
+
 # Create loggers
 app_logger = setup_logger("app")
+# Sample DEBUG records on app_logger (1 in 10 in DEBUG mode unless configured)
+app_logger.addFilter(SamplingFilter(
+    settings.LOG_SAMPLE_RATE or (10 if settings.DEBUG else 1)
+))
 api_logger = setup_logger("api")
 db_logger = setup_logger("db")
 
+# Access log, written directly as JSON lines without going through a Logger
+_access_log_file = open(log_dir / "access.log", "ab", buffering=64 * 1024)
+
+def write_access_log(entry: Dict[str, Any]):
+    """
+    Append a JSON line to the access log.
+    """
+    if orjson is not None:
+        line = orjson.dumps(entry, default=str) + b"\n"
+    else:
+        line = (json.dumps(entry, default=str) + "\n").encode()
+    _access_log_file.write(line)
+
 # Request logging middleware
 async def log_request(request, call_next):
     """
     Middleware to log request and response details.
     """
+    start_time = time.time()
     request_id = request.headers.get("x-request-id", "unknown")
     
     request_details = {
@@ -97,43 +233,49 @@ async def log_request(request, call_next):
         "user_agent": request.headers.get("user-agent", "unknown")
     }
     
-    api_logger.info(f"Request received: {request.method} {request.url.path}", extra=request_details)
-    
     try:
         response = await call_next(request)
         
-        response_details = {
-            **request_details,
-            "status_code": response.status_code
-        }
-        
-        api_logger.info(f"Response sent: {response.status_code}", extra=response_details)
+        write_access_log({
+            "ts": start_time,
+            "req": request_details,
+            "status": response.status_code,
+            "duration_ms": round((time.time() - start_time) * 1000, 2)
+        })
         
         return response
     except Exception as e:
-        error_details = {
-            **request_details,
-            "error": str(e),
-            "exception_type": type(e).__name__
-        }
+        write_access_log({
+            "ts": start_time,
+            "req": request_details,
+            "status": 500,
+            "duration_ms": round((time.time() - start_time) * 1000, 2)
+        })
         
-        api_logger.error(f"Error processing request: {str(e)}", exc_info=True, extra=error_details)
+        # The request details are in the access log, keyed by request_id
+        api_logger.error(
+            "Error processing request: %s", e, exc_info=True,
+            extra={
+                "request_id": request_id,
+                "error": str(e),
+                "exception_type": type(e).__name__
+            }
+        )
         raise
 
 def log_function_call(func_name: str, params: Dict[str, Any] = None, result: Any = None, error: Exception = None):
     """
     Log a function call with parameters and result.
     """
-    log_data = {
-        "function": func_name,
-        "params": params or {}
-    }
-    
     if error:
-        app_logger.error(f"Error in {func_name}: {str(error)}", exc_info=True, extra=log_data)
-    else:
+        log_data = {
+            "function": func_name,
+            "params": params or {}
+        }
+        app_logger.error("Error in %s: %s", func_name, error, exc_info=True, extra=log_data)
+    elif app_logger.isEnabledFor(logging.DEBUG):
         # Don't log the actual result as it might be large or contain sensitive data
-        app_logger.debug(f"Function {func_name} called", extra=log_data)
+        app_logger.debug("Function %s called", func_name, extra={"function": func_name, "params": params or {}})
         
 def get_logger(name: str):
     """
@@ -1,17 +1,26 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import httpx
-import json
+import jwt
+import asyncio
 from pydantic import BaseModel
 import time
 from typing import Optional, Dict, Any
-import os
 import logging
 
+try:
+    import orjson
+except ImportError:  # Fall back to httpx's stdlib JSON decoding
+    orjson = None
+
 from .config import get_settings
 
+logger = logging.getLogger(__name__)
+
 # Clerk Authentication Settings
 settings = get_settings()
+CLERK_ISSUER = f"https://{settings.CLERK_INSTANCE}.clerk.accounts.dev"
+CLERK_JWKS_URL = f"{CLERK_ISSUER}/.well-known/jwks.json"
 bearer_scheme = HTTPBearer(auto_error=False)  # Allow no auth in dev mode
 
 # User model for authentication
@@ -33,75 +42,125 @@ DEFAULT_DEV_USER = ClerkUser(
     role="admin"
 )
 
-# Cache for Clerk JWK
+def parse_json_response(response: httpx.Response) -> Any:
+    """Decode a JSON response body, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+# Shared HTTP client for Clerk requests, created on first use
+_http_client: Optional[httpx.AsyncClient] = None
+
+async def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client used for Clerk API requests"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=20),
+            http2=True
+        )
+    return _http_client
+
+async def close_http_client():
+    """Close the shared HTTP client"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+# Cache for Clerk JWK, parsed into public keys by key id
 clerk_jwk_cache = {
-    "keys": None,
+    "by_kid": {},
+    "fetched_at": 0,
     "expires_at": 0
 }
+clerk_jwk_lock = asyncio.Lock()
 
-async def get_clerk_public_keys():
-    """Get Clerk's public keys from their JWKS endpoint"""
-    try:
-        now = time.time()
-        
-        if clerk_jwk_cache["keys"] and clerk_jwk_cache["expires_at"] > now:
-            return clerk_jwk_cache["keys"]
-        
-        clerk_instance = os.getenv("CLERK_INSTANCE", "your-clerk-instance")
-        jwks_url = f"https://{clerk_instance}.clerk.accounts.dev/.well-known/jwks.json"
+# An unknown kid forces a refresh at most this often, so forged kids can't hammer the JWKS endpoint
+JWKS_FORCED_REFRESH_INTERVAL = 60
+
+def _clerk_jwk_cache_usable(force_refresh: bool) -> bool:
+    """Whether the cached keys can be used, or a forced refresh would be too soon after the last fetch"""
+    if not clerk_jwk_cache["by_kid"]:
+        return False
+    if force_refresh:
+        return time.time() - clerk_jwk_cache["fetched_at"] < JWKS_FORCED_REFRESH_INTERVAL
+    return clerk_jwk_cache["expires_at"] > time.time()
+
+async def get_clerk_public_keys(force_refresh: bool = False):
+    """
+    Get Clerk's public keys from their JWKS endpoint, keyed by kid.
+    force_refresh refetches them before the cache expires (rate limited), for rotated keys.
+    """
+    if _clerk_jwk_cache_usable(force_refresh):
+        return clerk_jwk_cache["by_kid"]
+    
+    async with clerk_jwk_lock:
+        # Another request may have refreshed the keys while we were waiting
+        if _clerk_jwk_cache_usable(force_refresh):
+            return clerk_jwk_cache["by_kid"]
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(jwks_url)
+        try:
+            client = await get_http_client()
+            response = await client.get(CLERK_JWKS_URL)
             if response.status_code != 200:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="Failed to fetch JWKS from Clerk"
                 )
             
-            keys = response.json()
-            clerk_jwk_cache["keys"] = keys
-            clerk_jwk_cache["expires_at"] = time.time() + 3600  # Cache for 1 hour
+            jwks = parse_json_response(response)
             
-            return keys
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to fetch JWKS from Clerk: {str(e)}"
-        )
+            # Parse each JWK into a public key once, not on every request
+            by_kid = {
+                key["kid"]: jwt.algorithms.RSAAlgorithm.from_jwk(key)
+                for key in jwks.get("keys", [])
+                if "kid" in key
+            }
+            
+            clerk_jwk_cache["by_kid"] = by_kid
+            clerk_jwk_cache["fetched_at"] = time.time()
+            clerk_jwk_cache["expires_at"] = clerk_jwk_cache["fetched_at"] + 3600  # Cache for 1 hour
+            
+            return by_kid
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to fetch JWKS from Clerk: {str(e)}"
+            )
 
 async def verify_clerk_jwt(token: str) -> Dict[str, Any]:
-    """Verify a Clerk JWT token"""
+    """Verify a Clerk JWT token against Clerk's signing keys"""
     try:
-        # In a production app, you would use a JWT library with the JWKs from Clerk
-        # to properly verify the token. This is simplified for the example.
-        
-        # Split the token
-        header_b64, payload_b64, signature = token.split(".")
-        
-        # Decode the payload
-        from base64 import b64decode
-        from base64 import urlsafe_b64decode
-        
-        def decode_base64(data):
-            # Fix padding
-            missing_padding = len(data) % 4
-            if missing_padding:
-                data += '=' * (4 - missing_padding)
-            return urlsafe_b64decode(data)
-        
-        payload_json = decode_base64(payload_b64)
-        payload = json.loads(payload_json)
-        
-        # Verify expiration
-        now = time.time()
-        if payload.get("exp") and payload["exp"] < now:
+        # Look up the signing key for this token
+        kid = jwt.get_unverified_header(token).get("kid")
+        signing_keys = await get_clerk_public_keys()
+        signing_key = signing_keys.get(kid)
+        if signing_key is None:
+            # Clerk may have rotated its keys since they were cached
+            signing_keys = await get_clerk_public_keys(force_refresh=True)
+            signing_key = signing_keys.get(kid)
+        if signing_key is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has expired"
+                detail="Invalid authentication token: unknown signing key"
             )
         
-        return payload
-    except Exception as e:
+        # Verify signature, expiration and issuer
+        return jwt.decode(
+            token,
+            signing_key,
+            algorithms=["RS256"],
+            issuer=CLERK_ISSUER,
+            options={"require": ["exp", "sub"], "verify_aud": False}
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has expired"
+        )
+    except jwt.PyJWTError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid authentication token: {str(e)}"
@@ -114,8 +173,6 @@ async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] =
     """
     # In debug mode, allow bypassing authentication
     if settings.DEBUG and (not credentials or not credentials.credentials):
-        # Use proper logging instead of print in production
-        logger = logging.getLogger(__name__)
         logger.info("Using default development user (no auth required)")
         return DEFAULT_DEV_USER
     
@@ -145,21 +202,21 @@ async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] =
 
     # If email is missing, fetch it from Clerk API
     if not email:
-        async with httpx.AsyncClient() as client:
-            res = await client.get(
-                f"https://api.clerk.com/v1/users/{user_id}",
-                headers={"Authorization": f"Bearer {settings.CLERK_SECRET_KEY}"}
+        client = await get_http_client()
+        res = await client.get(
+            f"https://api.clerk.com/v1/users/{user_id}",
+            headers={"Authorization": f"Bearer {settings.CLERK_SECRET_KEY}"}
+        )
+        if res.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Unable to fetch user from Clerk"
             )
-            if res.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Unable to fetch user from Clerk"
-                )
-            user_info = res.json()
-            email = user_info["email_addresses"][0]["email_address"]
-            first_name = user_info.get("first_name", "") or first_name
-            last_name = user_info.get("last_name", "") or last_name
-            metadata = user_info.get("public_metadata", {}) or metadata
+        user_info = parse_json_response(res)
+        email = user_info["email_addresses"][0]["email_address"]
+        first_name = user_info.get("first_name", "") or first_name
+        last_name = user_info.get("last_name", "") or last_name
+        metadata = user_info.get("public_metadata", {}) or metadata
 
     # Determine user role
     role = "admin" if payload.get("admin", False) else "user"
@@ -188,27 +245,25 @@ async def get_current_admin(current_user: ClerkUser = Depends(get_current_user))
 async def get_user_info(user_id: str) -> dict:
     """Get user information from Clerk"""
     try:
-        clerk_secret_key = os.getenv("CLERK_SECRET_KEY")
-        if not clerk_secret_key:
+        if not settings.CLERK_SECRET_KEY:
             raise ValueError("CLERK_SECRET_KEY not found in environment variables")
             
         headers = {
-            "Authorization": f"Bearer {clerk_secret_key}",
+            "Authorization": f"Bearer {settings.CLERK_SECRET_KEY}",
             "Content-Type": "application/json"
         }
         
-        clerk_instance = os.getenv("CLERK_INSTANCE", "your-clerk-instance")
         user_api_url = f"https://api.clerk.com/v1/users/{user_id}"
         
-        async with httpx.AsyncClient() as client:
-            res = await client.get(user_api_url, headers=headers)
-            if res.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Unable to fetch user from Clerk"
-                )
-            user_info = res.json()
-            return user_info
+        client = await get_http_client()
+        res = await client.get(user_api_url, headers=headers)
+        if res.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Unable to fetch user from Clerk"
+            )
+        user_info = parse_json_response(res)
+        return user_info
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
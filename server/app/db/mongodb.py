@@ -1,20 +1,32 @@
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ASCENDING
 from ..core.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 class MongoDB:
     client: AsyncIOMotorClient = None
+    database = None
+    _collections = {}
     
     @classmethod
     async def connect(cls):
         """Connect to MongoDB"""
         cls.client = AsyncIOMotorClient(settings.MONGODB_URL)
         cls.database = cls.client[settings.MONGODB_DB_NAME]
+        cls._collections = {}
+        
+        # Indexes used by the call stats queries
+        await cls.database.calls.create_indexes([
+            IndexModel([("owner_id", ASCENDING)])
+        ])
+        await cls.database.survey_results.create_indexes([
+            IndexModel([("call_id", ASCENDING)]),
+            IndexModel([("call_id", ASCENDING), ("duration_seconds", ASCENDING)])
+        ])
         
-        # Use proper logging instead of print
-        import logging
-        logger = logging.getLogger(__name__)
         logger.info(f"Connected to MongoDB at {settings.MONGODB_URL}")
     
     @classmethod
@@ -22,16 +34,15 @@ class MongoDB:
         """Close MongoDB connection"""
         if cls.client:
             cls.client.close()
-            
-            # Use proper logging instead of print
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info("Closed connection with MongoDB")
     
     @classmethod
     def get_db(cls):
-        return cls.client[settings.MONGODB_DB_NAME]
+        return cls.database
     
     @classmethod
     def get_collection(cls, collection_name: str):
-        return cls.get_db()[collection_name]
\ No newline at end of file
+        collection = cls._collections.get(collection_name)
+        if collection is None:
+            collection = cls._collections[collection_name] = cls.database[collection_name]
+        return collection
\ No newline at end of file
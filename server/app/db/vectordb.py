@@ -1,31 +1,59 @@
 from ..core.config import get_settings
+import asyncio
+import itertools
+import logging
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union, Iterator
+
+try:
+    from qdrant_client import QdrantClient, AsyncQdrantClient
+    from qdrant_client.http import models
+except ImportError:  # Only required when VECTOR_DB_TYPE is "qdrant"
+    QdrantClient = AsyncQdrantClient = models = None
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+def _batched(iterable, size: int):
+    """Yield successive lists of at most `size` items"""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+def _as_float32(embeddings) -> np.ndarray:
+    """Convert embeddings to a contiguous float32 array without copying when possible"""
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
 
 class VectorDB:
     _instance = None
+    _initialized = False
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(VectorDB, cls).__new__(cls)
+        if not cls._instance._initialized:
             cls._instance.initialize()
         return cls._instance
     
     def initialize(self):
         self.db_type = settings.VECTOR_DB_TYPE
+        self.async_client = None
+        self._handles: Dict[str, Any] = {}
         
         if self.db_type == "qdrant":
-            from qdrant_client import QdrantClient
+            if QdrantClient is None:
+                raise ImportError("qdrant-client is required when VECTOR_DB_TYPE is 'qdrant'")
             try:
-                qdrant_client = QdrantClient(url=settings.QDRANT_URL)
-                
-                # Use proper logging instead of print
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.info(f"Connected to Qdrant at {settings.QDRANT_URL}")
-                return qdrant_client
+                qdrant_options = {
+                    "url": settings.QDRANT_URL,
+                    "prefer_grpc": settings.QDRANT_PREFER_GRPC,
+                    "grpc_port": settings.QDRANT_GRPC_PORT,
+                    "timeout": 30
+                }
+                self.client = QdrantClient(**qdrant_options)
+                self.async_client = AsyncQdrantClient(**qdrant_options)
+                transport = "gRPC" if settings.QDRANT_PREFER_GRPC else "REST"
+                logger.info(f"Connected to Qdrant at {settings.QDRANT_URL} ({transport})")
             except Exception as e:
                 raise ConnectionError(f"Failed to connect to Qdrant: {e}")
         
@@ -36,42 +64,59 @@ class VectorDB:
                     api_key=settings.PINECONE_API_KEY,
                     environment=settings.PINECONE_ENVIRONMENT
                 )
-                index = pinecone.Index("embeddings")
-                
-                # Use proper logging instead of print
-                import logging
-                logger = logging.getLogger(__name__)
+                # Indexes are resolved per collection through the module-level client
+                self.client = pinecone
                 logger.info(f"Connected to Pinecone in {settings.PINECONE_ENVIRONMENT} environment")
-                return index
             except Exception as e:
                 raise ConnectionError(f"Failed to connect to Pinecone: {e}")
         
         elif self.db_type == "chroma":
             import chromadb
             try:
-                chroma_client = chromadb.Client()
-                
-                # Use proper logging instead of print
-                import logging
-                logger = logging.getLogger(__name__)
+                self.client = chromadb.Client()
                 logger.info("Connected to local ChromaDB")
-                return chroma_client
             except Exception as e:
                 raise ConnectionError(f"Failed to connect to ChromaDB: {e}")
         
         else:
             raise ValueError(f"Unsupported vector database type: {self.db_type}")
+        
+        self._initialized = True
+    
+    def _collection_handle(self, collection_name: str):
+        """Get the Pinecone index or Chroma collection handle, resolving it once per name"""
+        handle = self._handles.get(collection_name)
+        if handle is None:
+            if self.db_type == "pinecone":
+                # Enough threads for the concurrent async_req upserts in add_texts
+                handle = self.client.Index(collection_name, pool_threads=settings.VECTOR_DB_UPSERT_CONCURRENCY)
+            else:
+                handle = self.client.get_collection(name=collection_name)
+            self._handles[collection_name] = handle
+        return handle
     
     def create_collection(self, collection_name: str, dimension: int = 1536):
         """Create a new collection in the vector database"""
+        self._handles.pop(collection_name, None)
         if self.db_type == "qdrant":
-            from qdrant_client.http import models
+            quantization_config = None
+            if settings.QDRANT_SCALAR_QUANTIZATION:
+                # Keep int8 copies of the vectors in RAM; originals are used for rescoring
+                quantization_config = models.ScalarQuantization(
+                    scalar=models.ScalarQuantizationConfig(
+                        type=models.ScalarType.INT8,
+                        quantile=0.99,
+                        always_ram=True
+                    )
+                )
             self.client.recreate_collection(
                 collection_name=collection_name,
                 vectors_config=models.VectorParams(
                     size=dimension,
                     distance=models.Distance.COSINE
-                )
+                ),
+                quantization_config=quantization_config,
+                on_disk_payload=True
             )
         elif self.db_type == "pinecone":
             # Check if index exists, create it if it doesn't
@@ -84,15 +129,18 @@ class VectorDB:
         elif self.db_type == "chroma":
             self.client.create_collection(name=collection_name)
     
-    def add_texts(
+    async def add_texts(
         self,
         collection_name: str,
         texts: List[str],
-        embeddings: List[List[float]],
+        embeddings: Union[np.ndarray, List[List[float]]],
         metadatas: Optional[List[Dict[str, Any]]] = None,
         ids: Optional[List[str]] = None,
     ):
-        """Add texts and their embeddings to the vector database"""
+        """Add texts and their embeddings to the vector database in concurrent batches"""
+        # Convert the (N, D) float32 matrix to plain lists once, at the client boundary
+        vectors = _as_float32(embeddings).tolist()
+        
         if metadatas is None:
             metadatas = [{} for _ in texts]
         
@@ -100,33 +148,41 @@ class VectorDB:
             import uuid
             ids = [str(uuid.uuid4()) for _ in texts]
         
+        batch_size = settings.VECTOR_DB_UPSERT_BATCH_SIZE
+        
         if self.db_type == "qdrant":
-            from qdrant_client.http import models
-            self.client.upsert(
-                collection_name=collection_name,
-                points=[
-                    models.PointStruct(
-                        id=id,
-                        vector=embedding,
-                        payload={"text": text, **metadata}
-                    )
-                    for id, text, embedding, metadata in zip(ids, texts, embeddings, metadatas)
-                ]
-            )
-        elif self.db_type == "pinecone":
-            index = self.client.Index(collection_name)
-            index.upsert(
-                vectors=zip(
-                    ids,
-                    embeddings,
-                    [{"text": text, **metadata} for text, metadata in zip(texts, metadatas)]
+            points = [
+                models.PointStruct(
+                    id=id,
+                    vector=vector,
+                    payload={"text": text, "metadata": metadata}
                 )
+                for id, text, vector, metadata in zip(ids, texts, vectors, metadatas)
+            ]
+            semaphore = asyncio.Semaphore(settings.VECTOR_DB_UPSERT_CONCURRENCY)
+            
+            async def upsert_batch(batch):
+                async with semaphore:
+                    await self.async_client.upsert(collection_name=collection_name, points=batch)
+            
+            await asyncio.gather(*(upsert_batch(batch) for batch in _batched(points, batch_size)))
+        elif self.db_type == "pinecone":
+            index = self._collection_handle(collection_name)
+            records = zip(
+                ids,
+                vectors,
+                [{"text": text, **metadata} for text, metadata in zip(texts, metadatas)]
             )
+            futures = [
+                index.upsert(vectors=batch, async_req=True)
+                for batch in _batched(records, batch_size)
+            ]
+            await asyncio.to_thread(lambda: [future.get() for future in futures])
         elif self.db_type == "chroma":
-            collection = self.client.get_collection(name=collection_name)
+            collection = self._collection_handle(collection_name)
             collection.add(
                 documents=texts,
-                embeddings=embeddings,
+                embeddings=vectors,
                 metadatas=metadatas,
                 ids=ids
             )
@@ -134,58 +190,141 @@ class VectorDB:
     def similarity_search(
         self,
         collection_name: str,
-        query_embedding: List[float],
-        top_k: int = 5
+        query_embedding: Union[np.ndarray, List[float]],
+        top_k: int = 5,
+        payload_fields: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
-        """Search for similar documents based on embedding"""
+        """
+        Search for similar documents based on embedding.
+        For Qdrant, payload_fields limits which payload keys are returned.
+        """
+        return list(self.similarity_search_iter(collection_name, query_embedding, top_k, payload_fields))
+    
+    def similarity_search_iter(
+        self,
+        collection_name: str,
+        query_embedding: Union[np.ndarray, List[float]],
+        top_k: int = 5,
+        payload_fields: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Search for similar documents, yielding results one at a time"""
+        query_embedding = _as_float32(query_embedding)
+        
         if self.db_type == "qdrant":
             results = self.client.search(
                 collection_name=collection_name,
                 query_vector=query_embedding,
-                limit=top_k
+                limit=top_k,
+                with_payload=payload_fields or True,
+                with_vectors=False,
+                search_params=self._qdrant_search_params()
             )
-            return [
-                {
-                    "id": result.id,
-                    "text": result.payload.get("text", ""),
-                    "metadata": {k: v for k, v in result.payload.items() if k != "text"},
-                    "score": result.score
-                } 
-                for result in results
-            ]
+            yield from self._iter_qdrant_results(results)
         elif self.db_type == "pinecone":
-            index = self.client.Index(collection_name)
+            index = self._collection_handle(collection_name)
             results = index.query(
-                query_embedding,
+                query_embedding.tolist(),
                 top_k=top_k,
                 include_metadata=True
             )
-            return [
-                {
-                    "id": match.id,
-                    "text": match.metadata.get("text", ""),
-                    "metadata": {k: v for k, v in match.metadata.items() if k != "text"},
-                    "score": match.score
-                } 
-                for match in results.matches
-            ]
+            yield from self._iter_pinecone_results(results.matches)
         elif self.db_type == "chroma":
-            collection = self.client.get_collection(name=collection_name)
+            collection = self._collection_handle(collection_name)
             results = collection.query(
-                query_embeddings=[query_embedding],
+                query_embeddings=[query_embedding.tolist()],
                 n_results=top_k
             )
-            return [
-                {
-                    "id": id,
-                    "text": document,
-                    "metadata": metadata,
-                    "score": float(distance)
-                } 
-                for id, document, metadata, distance in zip(
-                    results["ids"][0],
-                    results["documents"][0],
-                    results["metadatas"][0],
-                    results["distances"][0]
-                )
-            ]
\ No newline at end of file
+            yield from self._iter_chroma_results(results, 0)
+    
+    def similarity_search_batch(
+        self,
+        collection_name: str,
+        query_embeddings: Union[np.ndarray, List[List[float]]],
+        top_k: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for similar documents for several embeddings in one request"""
+        if len(query_embeddings) == 0:
+            return []
+        
+        query_embeddings = _as_float32(query_embeddings).tolist()
+        
+        if self.db_type == "qdrant":
+            batch_results = self.client.search_batch(
+                collection_name=collection_name,
+                requests=[
+                    models.SearchRequest(
+                        vector=query_embedding,
+                        limit=top_k,
+                        with_payload=True,
+                        params=self._qdrant_search_params()
+                    )
+                    for query_embedding in query_embeddings
+                ]
+            )
+            return [list(self._iter_qdrant_results(results)) for results in batch_results]
+        elif self.db_type == "pinecone":
+            index = self._collection_handle(collection_name)
+            results = index.query(
+                queries=query_embeddings,
+                top_k=top_k,
+                include_metadata=True
+            )
+            return [list(self._iter_pinecone_results(query_result.matches)) for query_result in results.results]
+        elif self.db_type == "chroma":
+            collection = self._collection_handle(collection_name)
+            results = collection.query(
+                query_embeddings=query_embeddings,
+                n_results=top_k
+            )
+            return [list(self._iter_chroma_results(results, i)) for i in range(len(query_embeddings))]
+    
+    @staticmethod
+    def _qdrant_search_params():
+        """Search params that rescore quantized candidates against the original vectors"""
+        if not settings.QDRANT_SCALAR_QUANTIZATION:
+            return None
+        return models.SearchParams(
+            quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+        )
+    
+    @staticmethod
+    def _iter_qdrant_results(results) -> Iterator[Dict[str, Any]]:
+        for result in results:
+            payload = result.payload
+            metadata = payload.get("metadata")
+            if metadata is None:
+                # Points written before metadata was nested under its own key
+                metadata = {k: v for k, v in payload.items() if k != "text"}
+            yield {
+                "id": result.id,
+                "text": payload.get("text", ""),
+                "metadata": metadata,
+                "score": result.score
+            }
+    
+    @staticmethod
+    def _iter_pinecone_results(matches) -> Iterator[Dict[str, Any]]:
+        for match in matches:
+            yield {
+                "id": match.id,
+                "text": match.metadata.get("text", ""),
+                "metadata": {k: v for k, v in match.metadata.items() if k != "text"},
+                "score": match.score
+            }
+    
+    @staticmethod
+    def _iter_chroma_results(results: Dict[str, Any], query_index: int) -> Iterator[Dict[str, Any]]:
+        # Convert all distances to Python floats in one pass
+        scores = np.asarray(results["distances"][query_index], dtype=np.float32).tolist()
+        for id, document, metadata, score in zip(
+            results["ids"][query_index],
+            results["documents"][query_index],
+            results["metadatas"][query_index],
+            scores
+        ):
+            yield {
+                "id": id,
+                "text": document,
+                "metadata": metadata,
+                "score": score
+            }
@@ -1,13 +1,16 @@
 from fastapi import FastAPI, Depends, Request, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response, PlainTextResponse
+from fastapi.responses import ORJSONResponse, Response
 import uvicorn
 from contextlib import asynccontextmanager
-import os
+from functools import lru_cache
+from typing import Tuple
 from twilio.twiml.voice_response import VoiceResponse, Gather
 
 from .core.config import get_settings
-from .core.logging import log_request, app_logger
+from .core.logging import log_request, app_logger, flush_loggers
+from .core.security import close_http_client
+from .services.llm.cot_engine import close_llm_http_client
 from .db.mongodb import MongoDB
 from .api import auth, calls, knowledge, surveys, twilio_webhooks, nexmo_webhooks, test_whatsapp, optimization
 
@@ -33,15 +36,21 @@ async def lifespan(app: FastAPI):
     # Close database connections
     await MongoDB.close()
     
+    # Close shared HTTP clients
+    await close_http_client()
+    await close_llm_http_client()
+    
     # Perform any additional cleanup tasks here
     app_logger.info("Application shutdown complete")
+    flush_loggers()
 
 # Create FastAPI app
 app = FastAPI(
     title="LLM Phone Feedback System API",
     description="API for LLM-enhanced phone feedback system",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -63,7 +72,7 @@ async def logging_middleware(request: Request, call_next):
 async def global_exception_handler(request: Request, exc: Exception):
     app_logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "An unexpected error occurred, please try again later"}
     )
@@ -96,13 +105,11 @@ async def root():
     }
 
 # Emergency webhook routes
-@app.get("/emergency", response_class=PlainTextResponse)
-async def emergency_flow():
-    """Emergency call flow"""
-    webhook_base_url = os.getenv("WEBHOOK_BASE_URL", "https://your-ngrok-url.ngrok.io")
-    
-    response = VoiceResponse()
-    response.say("Emergency services. Please state your emergency.")
+@lru_cache(maxsize=1)
+def build_emergency_twiml(webhook_base_url: str) -> Tuple[bytes, bytes]:
+    """Build the emergency flow and gather TwiML once per webhook base URL"""
+    flow_response = VoiceResponse()
+    flow_response.say("Emergency services. Please state your emergency.")
     
     gather = Gather(
         input="dtmf speech", 
@@ -110,20 +117,13 @@ async def emergency_flow():
         method="POST"
     )
     gather.say("Press 1 for fire, 2 for police, 3 for medical emergency")
-    response.append(gather)
+    flow_response.append(gather)
     
-    response.say("No input received. Please call back.")
-    response.hangup()
-    
-    return str(response)
-
-@app.post("/emergency/gather", response_class=PlainTextResponse)
-async def emergency_gather():
-    """Handle emergency selection"""
-    webhook_base_url = os.getenv("WEBHOOK_BASE_URL", "https://your-ngrok-url.ngrok.io")
+    flow_response.say("No input received. Please call back.")
+    flow_response.hangup()
     
-    response = VoiceResponse()
-    response.say("Thank you for your selection. Emergency services are being contacted.")
+    gather_response = VoiceResponse()
+    gather_response.say("Thank you for your selection. Emergency services are being contacted.")
     
     gather = Gather(
         input="dtmf speech", 
@@ -133,12 +133,26 @@ async def emergency_gather():
         speechTimeout="auto"
     )
     gather.say("Please provide additional details about your emergency.")
-    response.append(gather)
+    gather_response.append(gather)
     
-    response.say("Emergency services have been notified. Help is on the way.")
-    response.hangup()
+    gather_response.say("Emergency services have been notified. Help is on the way.")
+    gather_response.hangup()
     
-    return str(response)
+    return str(flow_response).encode("utf-8"), str(gather_response).encode("utf-8")
+
+@app.get("/emergency")
+async def emergency_flow():
+    """Emergency call flow"""
+    webhook_base_url = settings.WEBHOOK_BASE_URL
+    flow_twiml, _ = build_emergency_twiml(webhook_base_url)
+    return Response(content=flow_twiml, media_type="application/xml")
+
+@app.post("/emergency/gather")
+async def emergency_gather():
+    """Handle emergency selection"""
+    webhook_base_url = settings.WEBHOOK_BASE_URL
+    _, gather_twiml = build_emergency_twiml(webhook_base_url)
+    return Response(content=gather_twiml, media_type="application/xml")
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -1,22 +1,13 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Dict, Any, Optional, Union
 from enum import Enum
 from datetime import datetime
 from bson import ObjectId
 
+from .object_id import PyObjectId
 
-class PyObjectId(str):
-    """Custom type for handling MongoDB ObjectIDs"""
-    
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-    
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return str(v)
+# Only the most recent events are kept on a call document
+MAX_CALL_EVENTS = 500
 
 
 class CallDirection(str, Enum):
@@ -83,9 +74,20 @@ class CallDB(CallBase):
     survey_result_id: Optional[str] = None
     metadata: Dict[str, Any] = {}
     
-    class Config:
-        json_encoders = {
-            ObjectId: str
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    @staticmethod
+    def push_events_update(events: List[CallEvent], **set_fields) -> Dict[str, Any]:
+        """
+        Build an update that appends events in place, keeping only the last MAX_CALL_EVENTS.
+        Extra keyword arguments are added to $set alongside updated_at.
+        """
+        return {
+            "$push": {"events": {
+                "$each": [event.model_dump() for event in events],
+                "$slice": -MAX_CALL_EVENTS
+            }},
+            "$set": {"updated_at": datetime.utcnow(), **set_fields}
         }
 
 
@@ -1,22 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Dict, Any, Optional, Union
 from enum import Enum
 from datetime import datetime
 from bson import ObjectId
 
-
-class PyObjectId(str):
-    """Custom type for handling MongoDB ObjectIDs"""
-    
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-    
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return str(v)
+from .object_id import PyObjectId
 
 
 class DocumentStatus(str, Enum):
@@ -69,10 +57,7 @@ class DocumentDB(DocumentBase):
     embeddings_count: Optional[int] = None  # Number of chunks/embeddings created
     vector_collection_name: Optional[str] = None  # Name of collection in vector DB
     
-    class Config:
-        json_encoders = {
-            ObjectId: str
-        }
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
 class DocumentUpdate(BaseModel):
@@ -107,10 +92,7 @@ class TextChunk(BaseModel):
     metadata: Dict[str, Any] = {}
     embedding: Optional[List[float]] = None
     
-    class Config:
-        json_encoders = {
-            ObjectId: str
-        }
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
 class SearchQuery(BaseModel):
@@ -0,0 +1,22 @@
+import re
+from typing import Annotated, Any
+
+from pydantic import BeforeValidator, WithJsonSchema
+
+# String form of a BSON ObjectId: 24 hex characters
+_OBJECTID_RE = re.compile(r"[0-9a-fA-F]{24}")
+
+
+def _validate_object_id(v: Any) -> str:
+    value = v if isinstance(v, str) else str(v)
+    if not _OBJECTID_RE.fullmatch(value):
+        raise ValueError("Invalid ObjectId")
+    return value
+
+
+# MongoDB ObjectID, accepted as an ObjectId or its hex string and stored as a string
+PyObjectId = Annotated[
+    str,
+    BeforeValidator(_validate_object_id),
+    WithJsonSchema({"type": "string", "pattern": "^[0-9a-fA-F]{24}$"})
+]
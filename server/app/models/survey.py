@@ -1,22 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import List, Dict, Any, Literal, Optional, Union
 from enum import Enum
 from datetime import datetime
 from bson import ObjectId
 
-
-class PyObjectId(str):
-    """Custom type for handling MongoDB ObjectIDs"""
-    
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-    
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return str(v)
+from .object_id import PyObjectId
 
 
 class QuestionType(str, Enum):
@@ -53,6 +41,17 @@ class VoiceSpeed(str, Enum):
     FAST = "fast"
 
 
+# Field types for the enums above. Values are stored and sent as plain strings,
+# and a Literal check validates faster than building an Enum member.
+QuestionTypeValue = Literal["open_ended", "numeric", "yes_no", "multiple_choice"]
+SurveyStatusValue = Literal["draft", "active", "paused", "completed", "archived"]
+VoiceTypeValue = Literal[
+    "neutral_female", "neutral_male", "professional_female",
+    "professional_male", "friendly_female", "friendly_male"
+]
+VoiceSpeedValue = Literal["slow", "normal", "fast"]
+
+
 class QuestionLogic(BaseModel):
     """Question logic for branching surveys"""
     condition: str  # e.g., "1-2", "3", "4-5", "yes", "no", or an option value
@@ -64,26 +63,30 @@ class SurveyQuestion(BaseModel):
     id: str
     text: str
     voice_prompt: str
-    question_type: QuestionType
+    question_type: QuestionTypeValue
     required: bool = True
     options: List[str] = []
     follow_up_logic: Dict[str, str] = {}  # condition -> question_id
 
 
+# Built once and reused to validate question lists loaded from the database
+QUESTIONS_ADAPTER = TypeAdapter(List[SurveyQuestion])
+
+
 class SurveyBase(BaseModel):
     """Base model for surveys with common fields"""
     title: str
     description: str
     intro_message: str
     outro_message: str
-    voice_type: VoiceType = VoiceType.NEUTRAL_FEMALE
-    voice_speed: VoiceSpeed = VoiceSpeed.NORMAL
+    voice_type: VoiceTypeValue = VoiceType.NEUTRAL_FEMALE.value
+    voice_speed: VoiceSpeedValue = VoiceSpeed.NORMAL.value
     max_duration: int = 10  # minutes
     max_retries: int = 3
     call_during_business_hours: bool = True
     avoid_weekends: bool = True
     respect_timezone: bool = True
-    status: SurveyStatus = SurveyStatus.DRAFT
+    status: SurveyStatusValue = SurveyStatus.DRAFT.value
     questions: List[SurveyQuestion]
 
 
@@ -99,10 +102,7 @@ class SurveyDB(SurveyBase):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
-    class Config:
-        json_encoders = {
-            ObjectId: str
-        }
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
 class SurveyUpdate(BaseModel):
@@ -111,14 +111,14 @@ class SurveyUpdate(BaseModel):
     description: Optional[str] = None
     intro_message: Optional[str] = None
     outro_message: Optional[str] = None
-    voice_type: Optional[VoiceType] = None
-    voice_speed: Optional[VoiceSpeed] = None
+    voice_type: Optional[VoiceTypeValue] = None
+    voice_speed: Optional[VoiceSpeedValue] = None
     max_duration: Optional[int] = None
     max_retries: Optional[int] = None
     call_during_business_hours: Optional[bool] = None
     avoid_weekends: Optional[bool] = None
     respect_timezone: Optional[bool] = None
-    status: Optional[SurveyStatus] = None
+    status: Optional[SurveyStatusValue] = None
     questions: Optional[List[SurveyQuestion]] = None
 
 
@@ -144,7 +144,4 @@ class SurveyResult(BaseModel):
     sentiment_scores: Dict[str, float] = {}  # question_id -> sentiment score
     overall_sentiment: Optional[float] = None
     
-    class Config:
-        json_encoders = {
-            ObjectId: str
-        }
\ No newline at end of file
+    model_config = ConfigDict(arbitrary_types_allowed=True)
\ No newline at end of file
@@ -1,22 +1,10 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, ConfigDict, Field, EmailStr
+from typing import List, Dict, Any, Literal, Optional
 from enum import Enum
 from datetime import datetime
 from bson import ObjectId
 
-
-class PyObjectId(str):
-    """Custom type for handling MongoDB ObjectIDs"""
-    
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-    
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return str(v)
+from .object_id import PyObjectId
 
 
 class UserStatus(str, Enum):
@@ -34,14 +22,19 @@ class UserRole(str, Enum):
     VIEWER = "viewer"
 
 
+# Field types for the enums above, validated as plain strings
+UserStatusValue = Literal["active", "inactive", "pending"]
+UserRoleValue = Literal["admin", "manager", "agent", "viewer"]
+
+
 class UserBase(BaseModel):
     """Base model for users with common fields"""
     clerk_id: str
     email: EmailStr
     first_name: Optional[str] = None
     last_name: Optional[str] = None
-    role: UserRole = UserRole.AGENT
-    status: UserStatus = UserStatus.ACTIVE
+    role: UserRoleValue = UserRole.AGENT.value
+    status: UserStatusValue = UserStatus.ACTIVE.value
     profile_completed: bool = False
     phone_number: Optional[str] = None
     job_title: Optional[str] = None
@@ -58,10 +51,7 @@ class UserDB(UserBase):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     last_login: Optional[datetime] = None
     
-    class Config:
-        json_encoders = {
-            ObjectId: str
-        }
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
 class UserCreate(UserBase):
@@ -73,8 +63,8 @@ class UserUpdate(BaseModel):
     """Model for updating an existing user"""
     first_name: Optional[str] = None
     last_name: Optional[str] = None
-    role: Optional[UserRole] = None
-    status: Optional[UserStatus] = None
+    role: Optional[UserRoleValue] = None
+    status: Optional[UserStatusValue] = None
     profile_completed: Optional[bool] = None
     phone_number: Optional[str] = None
     job_title: Optional[str] = None
@@ -100,7 +90,4 @@ class UserActivity(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     details: Dict[str, Any] = {}
     
-    class Config:
-        json_encoders = {
-            ObjectId: str
-        }
\ No newline at end of file
+    model_config = ConfigDict(arbitrary_types_allowed=True)
\ No newline at end of file
@@ -1,7 +1,39 @@
+import csv
+import functools
+import io
+import logging
 import os
-from typing import List, Union, Dict, Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Union, Dict, Any, Optional
 import pathlib
 
+logger = logging.getLogger(__name__)
+
+# Parser libraries are imported on first use, so e.g. pandas is only loaded for spreadsheets
+@functools.cache
+def _fitz():
+    # PyMuPDF is optional; PDFs fall back to pypdf without it
+    try:
+        import fitz
+    except ImportError:
+        return None
+    return fitz
+
+@functools.cache
+def _pdf_reader_class():
+    from pypdf import PdfReader
+    return PdfReader
+
+@functools.cache
+def _docx2txt():
+    import docx2txt
+    return docx2txt
+
+@functools.cache
+def _pandas():
+    import pandas
+    return pandas
+
 class DocumentLoader:
     """Load documents from various sources"""
     
@@ -36,29 +68,69 @@ class DocumentLoader:
         return {"content": content, "metadata": metadata}
     
     @staticmethod
-    def load_files(file_paths: List[Union[str, pathlib.Path]]) -> List[Dict[str, Any]]:
-        """Load multiple files and return their contents and metadata"""
-        documents = []
-        for file_path in file_paths:
-            documents.append(DocumentLoader.load_file(file_path))
+    def load_files(
+        file_paths: List[Union[str, pathlib.Path]],
+        max_workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Load multiple files in parallel and return their contents and metadata, in input order"""
+        if len(file_paths) <= 1:
+            return [DocumentLoader.load_file(file_path) for file_path in file_paths]
+        
+        max_workers = max_workers or os.cpu_count()
+        
+        # Plain text is I/O-bound and read on threads; PDF, DOCX and tabular
+        # parsing is CPU-bound and runs in worker processes
+        text_indices = []
+        parsed_indices = []
+        for i, file_path in enumerate(file_paths):
+            if pathlib.Path(file_path).suffix.lower() == ".txt":
+                text_indices.append(i)
+            else:
+                parsed_indices.append(i)
+        
+        documents = [None] * len(file_paths)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(text_indices)))) as threads:
+            # Text reads start first and overlap with the process pool below
+            text_results = threads.map(DocumentLoader.load_file, [file_paths[i] for i in text_indices])
+            
+            if parsed_indices:
+                process_count = min(max_workers, len(parsed_indices))
+                with ProcessPoolExecutor(max_workers=process_count) as processes:
+                    # Batches amortize IPC over many files, but small ones must still spread across workers
+                    parsed_results = processes.map(
+                        DocumentLoader.load_file,
+                        [file_paths[i] for i in parsed_indices],
+                        chunksize=max(1, len(parsed_indices) // (process_count * 4))
+                    )
+                    for i, document in zip(parsed_indices, parsed_results):
+                        documents[i] = document
+            
+            for i, document in zip(text_indices, text_results):
+                documents[i] = document
+        
         return documents
     
     @staticmethod
     def _read_pdf(file_path: pathlib.Path) -> str:
         """Extract text from a PDF file"""
-        from pypdf import PdfReader
+        fitz = _fitz()
+        if fitz is not None:
+            try:
+                # MuPDF extracts text in C; a document handle must not be shared across threads
+                with fitz.open(str(file_path)) as doc:
+                    return "\n".join(page.get_text() for page in doc)
+            except Exception as e:
+                logger.warning(f"PyMuPDF failed to read {file_path}, falling back to pypdf: {str(e)}")
         
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        reader = _pdf_reader_class()(file_path)
+        # extract_text() can return None for image-only pages
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
     
     @staticmethod
     def _read_docx(file_path: pathlib.Path) -> str:
         """Extract text from a DOCX file"""
-        import docx2txt
-        return docx2txt.process(file_path)
+        return _docx2txt().process(file_path)
     
     @staticmethod
     def _read_text(file_path: pathlib.Path) -> str:
@@ -69,13 +141,15 @@ class DocumentLoader:
     @staticmethod
     def _read_tabular(file_path: pathlib.Path) -> str:
         """Extract content from tabular data files (CSV, Excel)"""
-        import pandas as pd
-        
         extension = file_path.suffix.lower()
         if extension == '.csv':
-            df = pd.read_csv(file_path)
-        else:  # .xlsx or .xls
-            df = pd.read_excel(file_path)
+            # Stream rows straight to tab-separated text, without building a DataFrame
+            buffer = io.StringIO()
+            with open(file_path, 'r', newline='', encoding='utf-8') as file:
+                csv.writer(buffer, delimiter='\t', lineterminator='\n').writerows(csv.reader(file))
+            return buffer.getvalue()
+        
+        df = _pandas().read_excel(file_path)  # .xlsx or .xls
         
         # Convert DataFrame to a readable string format
         return df.to_string()
\ No newline at end of file
@@ -1,9 +1,31 @@
 from typing import List
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from ...core.config import get_settings
 
 settings = get_settings()
 
+# Ollama models are configured as EMBEDDING_MODEL=ollama/<model name>
+OLLAMA_MODEL_PREFIX = "ollama/"
+OLLAMA_BATCH_SIZE = 96
+
+SENTENCE_TRANSFORMERS_BATCH_SIZE = 64
+
+# OpenAI accepts up to 1000 inputs per request; batches are sent concurrently
+OPENAI_BATCH_SIZE = 1000
+OPENAI_MAX_CONCURRENT_REQUESTS = 8
+
+# Process-wide LRU cache of embeddings, keyed by model name and content hash
+_embedding_cache = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+
+def _content_key(model_name: str, text: str) -> tuple:
+    return model_name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
 class EmbeddingGenerator:
     """Generate embeddings for text using various models"""
     
@@ -17,6 +39,8 @@ class EmbeddingGenerator:
             self._init_openai()
         elif self.model_name in ["all-mpnet-base-v2", "all-MiniLM-L6-v2"]:
             self._init_sentence_transformers()
+        elif self.model_name.startswith(OLLAMA_MODEL_PREFIX):
+            self._init_ollama()
         else:
             raise ValueError(f"Unsupported embedding model: {self.model_name}")
     
@@ -35,43 +59,161 @@ class EmbeddingGenerator:
                 logger = logging.getLogger(__name__)
                 logger.debug(f"Cleaned API KEY for client: {repr(cleaned_key)}")
             
+            self.api_key = cleaned_key
             self.client = OpenAI(api_key=cleaned_key)
         else:
             raise ValueError("OPENAI_API_KEY is required")
     
     def _init_sentence_transformers(self):
         """Initialize Sentence Transformers embedding model"""
+        import torch
         from sentence_transformers import SentenceTransformer
         self.model = SentenceTransformer(self.model_name)
+        
+        # Half precision on GPU roughly doubles encoding throughput
+        if torch.cuda.is_available():
+            self.model = self.model.to("cuda").half()
+    
+    def _init_ollama(self):
+        """Initialize an Ollama embedding model (EMBEDDING_MODEL=ollama/<model>)"""
+        import httpx
+        self.ollama_model = self.model_name[len(OLLAMA_MODEL_PREFIX):]
+        self.client = httpx.Client(base_url=settings.OLLAMA_BASE_URL, timeout=60.0)
     
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts"""
+        """Generate embeddings for a list of texts, reusing cached vectors for repeated content"""
         if not texts:
             return []
         
+        if settings.EMBEDDING_CACHE_SIZE <= 0:
+            return self._generate_uncached_embeddings(texts)
+        
+        keys = [_content_key(self.model_name, text) for text in texts]
+        embeddings = [None] * len(texts)
+        
+        with _embedding_cache_lock:
+            for i, key in enumerate(keys):
+                embedding = _embedding_cache.get(key)
+                if embedding is not None:
+                    _embedding_cache.move_to_end(key)
+                    embeddings[i] = embedding
+        
+        # Embed each distinct missing text once
+        missing = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(keys[i], []).append(i)
+        
+        if missing:
+            missing_texts = [texts[indices[0]] for indices in missing.values()]
+            new_embeddings = self._generate_uncached_embeddings(missing_texts)
+            
+            with _embedding_cache_lock:
+                for (key, indices), embedding in zip(missing.items(), new_embeddings):
+                    for i in indices:
+                        embeddings[i] = embedding
+                    _embedding_cache[key] = embedding
+                while len(_embedding_cache) > settings.EMBEDDING_CACHE_SIZE:
+                    _embedding_cache.popitem(last=False)
+        
+        return embeddings
+    
+    def _generate_uncached_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings with the configured backend"""
         if self.model_name == "text-embedding-ada-002":
             return self._generate_openai_embeddings(texts)
+        elif self.model_name.startswith(OLLAMA_MODEL_PREFIX):
+            return self._generate_ollama_embeddings(texts)
         else:
             return self._generate_st_embeddings(texts)
     
     def _generate_openai_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings using OpenAI's API"""
-        # Split into batches of 1000 (OpenAI's limit)
-        batch_size = 1000
-        all_embeddings = []
-        
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i+batch_size]
+        # A single batch (e.g. a search query) is one plain request
+        if len(texts) <= OPENAI_BATCH_SIZE:
             response = self.client.embeddings.create(
                 model=self.model_name,
-                input=batch_texts
+                input=texts
             )
-            batch_embeddings = [item.embedding for item in response.data]
-            all_embeddings.extend(batch_embeddings)
+            return [item.embedding for item in response.data]
         
-        return all_embeddings
+        coroutine = self._generate_openai_embeddings_async(texts)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        
+        # Called from inside an event loop: run the batches on their own loop in a worker thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+    
+    async def _generate_openai_embeddings_async(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings using OpenAI's API, sending batches concurrently"""
+        from openai import AsyncOpenAI
+        
+        semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENT_REQUESTS)
+        
+        async with AsyncOpenAI(api_key=self.api_key) as client:
+            async def embed_batch(batch_texts: List[str]) -> List[List[float]]:
+                async with semaphore:
+                    response = await client.embeddings.create(
+                        model=self.model_name,
+                        input=batch_texts
+                    )
+                    return [item.embedding for item in response.data]
+            
+            batches = await asyncio.gather(*(
+                embed_batch(texts[i:i + OPENAI_BATCH_SIZE])
+                for i in range(0, len(texts), OPENAI_BATCH_SIZE)
+            ))
+        
+        return [embedding for batch in batches for embedding in batch]
     
     def _generate_st_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings using Sentence Transformers"""
-        embeddings = self.model.encode(texts)
-        return embeddings.tolist()  # Convert numpy arrays to lists for JSON serialization
+        embeddings = self.model.encode(
+            texts,
+            batch_size=SENTENCE_TRANSFORMERS_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        # FP16 output is widened back to float32 before converting to lists
+        return embeddings.astype(np.float32, copy=False).tolist()
+    
+    def _generate_ollama_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings using Ollama's batch /api/embed endpoint"""
+        # Group similar lengths together so each batch is padded as little as possible
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        all_embeddings = [None] * len(texts)
+        
+        for start in range(0, len(order), OLLAMA_BATCH_SIZE):
+            batch_indices = order[start:start + OLLAMA_BATCH_SIZE]
+            batch_texts = [texts[i] for i in batch_indices]
+            
+            response = self.client.post(
+                "/api/embed",
+                json={"model": self.ollama_model, "input": batch_texts}
+            )
+            
+            # Older Ollama versions only have the single-text /api/embeddings endpoint
+            if response.status_code == 404:
+                batch_embeddings = None
+            else:
+                response.raise_for_status()
+                batch_embeddings = response.json().get("embeddings")
+            
+            if batch_embeddings is None:
+                batch_embeddings = []
+                for text in batch_texts:
+                    response = self.client.post(
+                        "/api/embeddings",
+                        json={"model": self.ollama_model, "prompt": text}
+                    )
+                    response.raise_for_status()
+                    batch_embeddings.append(response.json()["embedding"])
+            
+            for i, embedding in zip(batch_indices, batch_embeddings):
+                all_embeddings[i] = embedding
+        
+        return all_embeddings
@@ -1,4 +1,16 @@
-from typing import List, Dict, Any
+import bisect
+import re
+from typing import List, Dict, Any, Tuple
+
+# Natural break points, in order of preference, with the length of each separator.
+# Lookaheads match overlapping separators (e.g. every "\n\n" inside "\n\n\n").
+_BREAK_PATTERNS = [
+    (re.compile(r"(?=\n\n)"), 2),  # Paragraph break
+    (re.compile(r"(?=\n)"), 1),    # Single newline
+    (re.compile(r"(?=\. )"), 2),   # End of a sentence
+    (re.compile(r"(?=! )"), 2),
+    (re.compile(r"(?=\? )"), 2),
+]
 
 class TextChunker:
     """Split document text into smaller chunks for processing"""
@@ -23,44 +35,54 @@ class TextChunker:
         if len(text) <= chunk_size:
             return [{"content": text, "metadata": metadata}]
         
+        # Scan the text once per break type, recording the offset just past each separator
+        break_offsets = [
+            ([match.start() + sep_len for match in pattern.finditer(text)], sep_len)
+            for pattern, sep_len in _BREAK_PATTERNS
+        ]
+        
         chunks = []
+        for start, end in TextChunker._chunk_boundaries(len(text), break_offsets, chunk_size, chunk_overlap):
+            # Create chunk-specific metadata in a single merge
+            chunks.append({
+                "content": text[start:end],
+                "metadata": {
+                    **metadata,
+                    "chunk_index": len(chunks),
+                    "chunk_start_char": start,
+                    "chunk_end_char": end
+                }
+            })
+        
+        return chunks
+    
+    @staticmethod
+    def _chunk_boundaries(
+        text_length: int,
+        break_offsets: List[Tuple[List[int], int]],
+        chunk_size: int,
+        chunk_overlap: int
+    ) -> List[Tuple[int, int]]:
+        """Compute (start, end) character offsets for each chunk from precomputed break offsets"""
+        boundaries = []
         start = 0
         
-        while start < len(text):
+        while start < text_length:
             # Find the end of this chunk
             end = start + chunk_size
             
             # If we're not at the end of the document, try to find a natural break point
-            if end < len(text):
-                # Try to find a paragraph break
-                paragraph_break = text.rfind("\n\n", start, end)
-                if paragraph_break != -1 and paragraph_break > start + chunk_size // 2:
-                    end = paragraph_break + 2  # Include the double newline
-                else:
-                    # Try to find a single newline
-                    newline = text.rfind("\n", start, end)
-                    if newline != -1 and newline > start + chunk_size // 2:
-                        end = newline + 1  # Include the newline
-                    else:
-                        # Try to find the end of a sentence
-                        for sep in [". ", "! ", "? "]:
-                            sentence_end = text.rfind(sep, start, end)
-                            if sentence_end != -1 and sentence_end > start + chunk_size // 2:
-                                end = sentence_end + 2  # Include the separator
-                                break
-            
-            # Extract the chunk
-            chunk = text[start:end]
-            
-            # Create chunk-specific metadata
-            chunk_metadata = metadata.copy()
-            chunk_metadata["chunk_index"] = len(chunks)
-            chunk_metadata["chunk_start_char"] = start
-            chunk_metadata["chunk_end_char"] = end
+            if end < text_length:
+                # Take the last break of the most preferred type in the second half of the window
+                for offsets, sep_len in break_offsets:
+                    idx = bisect.bisect_right(offsets, end) - 1
+                    if idx >= 0 and offsets[idx] > start + chunk_size // 2 + sep_len:
+                        end = offsets[idx]  # Include the separator
+                        break
             
-            chunks.append({"content": chunk, "metadata": chunk_metadata})
+            boundaries.append((start, end))
             
             # Move the start pointer for the next chunk, accounting for overlap
             start = end - chunk_overlap
         
-        return chunks
\ No newline at end of file
+        return boundaries
\ No newline at end of file
@@ -1,7 +1,11 @@
 from typing import Dict, Any, List, Optional, Union, Callable
 import json
+import re
+import time
+import itertools
 import asyncio
 from datetime import datetime
+from types import MappingProxyType
 
 from ...core.config import get_settings
 from ...core.logging import get_logger
@@ -9,23 +13,39 @@ from ...core.logging import get_logger
 logger = get_logger("services.llm.action_tools")
 settings = get_settings()
 
+# Keyword lists for the simulated sentiment analysis
+POSITIVE_INDICATORS = frozenset(["good", "great", "happy", "satisfied", "excellent", "thank", "appreciate"])
+NEGATIVE_INDICATORS = frozenset(["bad", "poor", "unhappy", "disappointed", "terrible", "issue", "problem"])
+
+# Lookahead so overlapping keywords are all found (e.g. "happy" inside "unhappy").
+# Case-insensitive matching avoids lowercasing a copy of the whole text.
+_SENTIMENT_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(sorted(POSITIVE_INDICATORS | NEGATIVE_INDICATORS)) + "))",
+    re.IGNORECASE
+)
+
+# Mock ticket IDs: process start time plus a counter, no randomness needed
+_TICKET_ID_PREFIX = f"{int(time.time()) & 0xFFFFFFFF:08X}"
+_ticket_counter = itertools.count()
+
+def tool(func: Callable) -> Callable:
+    """Mark an ActionTools method as a tool the LLM can call"""
+    func._is_tool = True
+    return func
+
 class ActionTools:
     """
     Provides tools and functions that can be called by the LLM to take actions
     during phone surveys and conversations.
     """
     
+    # Tool name -> unbound method, built once after the class body
+    _tool_table: MappingProxyType = MappingProxyType({})
+    _tools_description: str = ""
+    
     def __init__(self):
         """Initialize action tools"""
-        self.tools = {
-            "create_ticket": self.create_ticket,
-            "lookup_information": self.lookup_information,
-            "execute_sentiment_analysis": self.execute_sentiment_analysis,
-            "transfer_to_agent": self.transfer_to_agent,
-            "send_notification": self.send_notification,
-            "get_customer_data": self.get_customer_data,
-            "schedule_callback": self.schedule_callback
-        }
+        self.tools = {name: getattr(self, name) for name in self._tool_table}
     
     def get_tools_description(self) -> str:
         """
@@ -34,13 +54,7 @@ class ActionTools:
         Returns:
             str: Description of available tools
         """
-        description = "You have access to the following tools to assist during the conversation:\n\n"
-        
-        for name, func in self.tools.items():
-            doc = func.__doc__ or "No description available"
-            description += f"- {name}: {doc.strip().split('.')[0]}.\n"
-        
-        return description
+        return self._tools_description
     
     def get_available_tools(self) -> Dict[str, Callable]:
         """
@@ -62,15 +76,15 @@ class ActionTools:
         Returns:
             Dict: Tool execution result
         """
-        if tool_name not in self.tools:
+        tool_func = self._tool_table.get(tool_name)
+        if tool_func is None:
             return {
                 "error": f"Tool '{tool_name}' not found",
-                "available_tools": list(self.tools.keys())
+                "available_tools": list(self._tool_table)
             }
         
         try:
-            tool_func = self.tools[tool_name]
-            result = await tool_func(**params)
+            result = await tool_func(self, **params)
             return {
                 "tool": tool_name,
                 "result": result,
@@ -84,6 +98,7 @@ class ActionTools:
                 "timestamp": datetime.utcnow().isoformat()
             }
     
+    @tool
     async def create_ticket(
         self, 
         title: str, 
@@ -111,8 +126,7 @@ class ActionTools:
         logger.info(f"Simulating ticket creation: {title}")
         
         # Generate a mock ticket ID
-        import uuid
-        ticket_id = f"TKT-{uuid.uuid4().hex[:8].upper()}"
+        ticket_id = f"TKT-{_TICKET_ID_PREFIX}{next(_ticket_counter):04X}"
         
         return {
             "ticket_id": ticket_id,
@@ -124,6 +138,7 @@ class ActionTools:
             "status": "open"
         }
     
+    @tool
     async def lookup_information(
         self, 
         query: str,
@@ -155,6 +170,7 @@ class ActionTools:
             "timestamp": datetime.utcnow().isoformat()
         }
     
+    @tool
     async def execute_sentiment_analysis(
         self, 
         text: str
@@ -171,14 +187,11 @@ class ActionTools:
         # In a real implementation, this would use a sentiment analysis service or model
         logger.info(f"Simulating sentiment analysis for text: {text[:50]}...")
         
-        # Generate mock sentiment scores based on keywords
-        positive_indicators = ["good", "great", "happy", "satisfied", "excellent", "thank", "appreciate"]
-        negative_indicators = ["bad", "poor", "unhappy", "disappointed", "terrible", "issue", "problem"]
-        
-        text_lower = text.lower()
+        # Generate mock sentiment scores based on keywords, found in a single pass
+        found = {match.group(1).lower() for match in _SENTIMENT_KEYWORD_RE.finditer(text)}
         
-        positive_count = sum(1 for word in positive_indicators if word in text_lower)
-        negative_count = sum(1 for word in negative_indicators if word in text_lower)
+        positive_count = len(found & POSITIVE_INDICATORS)
+        negative_count = len(found & NEGATIVE_INDICATORS)
         
         total = positive_count + negative_count
         
@@ -205,6 +218,7 @@ class ActionTools:
             "analyzed_text": text[:100] + ("..." if len(text) > 100 else "")
         }
     
+    @tool
     async def transfer_to_agent(
         self, 
         reason: str,
@@ -233,6 +247,7 @@ class ActionTools:
             "estimated_wait_time": "3-5 minutes"
         }
     
+    @tool
     async def send_notification(
         self, 
         message: str,
@@ -255,16 +270,19 @@ class ActionTools:
         # In a real implementation, this would send a notification
         logger.info(f"Simulating notification: {message}")
         
+        now = datetime.utcnow()
+        
         return {
-            "notification_id": f"NOTIF-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
+            "notification_id": f"NOTIF-{now.strftime('%Y%m%d%H%M%S')}",
             "message": message,
             "recipient_type": recipient_type,
             "recipient_id": recipient_id,
             "type": notification_type,
             "status": "sent",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": now.isoformat()
         }
     
+    @tool
     async def get_customer_data(
         self, 
         phone_number: str,
@@ -298,6 +316,7 @@ class ActionTools:
             }
         }
     
+    @tool
     async def schedule_callback(
         self, 
         phone_number: str,
@@ -329,4 +348,17 @@ class ActionTools:
             "reason": reason,
             "scheduled_time": preferred_time or "Next available time",
             "status": "scheduled"
-        }
\ No newline at end of file
+        }
+
+ActionTools._tool_table = MappingProxyType({
+    name: func for name, func in vars(ActionTools).items() if getattr(func, "_is_tool", False)
+})
+
+# Tool docstrings never change at runtime, so the description is formatted once
+ActionTools._tools_description = (
+    "You have access to the following tools to assist during the conversation:\n\n"
+    + "".join(
+        f"- {name}: {(func.__doc__ or 'No description available').strip().split('.')[0]}.\n"
+        for name, func in ActionTools._tool_table.items()
+    )
+)
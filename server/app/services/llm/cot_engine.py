@@ -1,16 +1,245 @@
 import json
 import os
 import re
+import time
+import unicodedata
 import asyncio
-import backoff
-from typing import Dict, Any, List, Optional, Union
+import contextlib
+import copy
+import functools
+import anthropic
+import httpx
+import openai
+import orjson
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
 
 from ...core.config import get_settings
 from ...core.logging import get_logger
+from .response_cache import structured_output_cache
+from ..optimization.token_optimizer import count_tokens
 
 logger = get_logger("services.llm.cot_engine")
 settings = get_settings()
 
+# Patterns used on every response, compiled once
+_FINAL_OUTPUT_RE = re.compile(r"FINAL OUTPUT:?", re.IGNORECASE)
+_CODEBLOCK_JSON_RE = re.compile(r'```json\s*')
+_CODEBLOCK_RE = re.compile(r'```\s*')
+_SINGLE_Q_KEY_RE = re.compile(r"'([^']*)':")
+_SINGLE_Q_VAL_RE = re.compile(r":\s*'([^']*)'")
+_TRAIL_COMMA_OBJ_RE = re.compile(r',\s*}')
+_TRAIL_COMMA_ARR_RE = re.compile(r',\s*]')
+# Characters that change brace depth or string state while scanning for a JSON object
+_JSON_STRUCTURE_RE = re.compile(r'[{}"\\]')
+# Field names in a string schema, e.g. "sentiment": in an example JSON object
+_SCHEMA_FIELD_RE = re.compile(r'"(\w+)"\s*:')
+
+# Fallback responses by schema fingerprint (the sorted field names), used when output can't be parsed
+_FALLBACKS: Dict[Tuple[str, ...], Dict[str, Any]] = {
+    # Sentiment analysis
+    ("confidence", "nuances", "score", "sentiment", "themes"): {
+        "sentiment": "neutral",
+        "score": 0.0,
+        "confidence": 0.5,
+        "themes": [],
+        "nuances": "Could not analyze due to API error"
+    },
+    # Feedback insights
+    ("action_items", "follow_up_recommended", "key_points", "mentioned_items", "satisfaction_level"): {
+        "key_points": [],
+        "action_items": [],
+        "mentioned_items": [],
+        "satisfaction_level": "neutral",
+        "follow_up_recommended": False
+    }
+}
+
+# Structured output analyzes at most this many characters of the input text
+_STRUCTURED_TEXT_LIMIT = 100
+_ANALYZE_TEXT_PROMPT = 'Analyze this text: "%s"'
+# Zero-width joiner and variation selectors extend the preceding character
+_GRAPHEME_EXTENDERS = frozenset("\u200d\ufe0e\ufe0f")
+
+def _safe_truncate(text: str, limit: int) -> str:
+    """Truncate text to at most limit characters without splitting a character from its combining marks"""
+    if len(text) <= limit:
+        return text
+    
+    end = limit
+    while end > 0 and (
+        text[end] in _GRAPHEME_EXTENDERS
+        or text[end - 1] in _GRAPHEME_EXTENDERS
+        or unicodedata.combining(text[end])
+    ):
+        end -= 1
+    return text[:end]
+
+# Name of the Anthropic tool used to return structured output
+_STRUCTURED_OUTPUT_TOOL = "structured_output"
+# Provider-native structured output must be an object; other schemas are wrapped in this key
+_NATIVE_RESULT_KEY = "result"
+
+def _strict_json_schema(schema: Any) -> Any:
+    """Copy of a JSON schema where every object is closed and requires all of its properties"""
+    if isinstance(schema, list):
+        return [_strict_json_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    
+    strict = {key: _strict_json_schema(value) for key, value in schema.items()}
+    if strict.get("type") == "object" or "properties" in strict:
+        strict.setdefault("properties", {})
+        strict["required"] = list(strict["properties"])
+        strict["additionalProperties"] = False
+    return strict
+
+# Callers pass the same few schemas on every call, so derived forms are cached by the schema's JSON
+@functools.lru_cache(maxsize=64)
+def _native_schema_from_json(schema_json: str) -> Dict[str, Any]:
+    schema = json.loads(schema_json)
+    if schema.get("type") == "object":
+        return _strict_json_schema(schema)
+    return _strict_json_schema({"type": "object", "properties": {_NATIVE_RESULT_KEY: schema}})
+
+@functools.lru_cache(maxsize=64)
+def _render_schema(schema_json: str, properties_only: bool = True) -> str:
+    schema = json.loads(schema_json)
+    return json.dumps(schema.get("properties", {}) if properties_only else schema, indent=2)
+
+def _native_json_schema(schema: Union[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Object schema to send to the provider's native structured output, or None to use the prompt only.
+    The result is shared between calls and must not be modified.
+    """
+    if not settings.LLM_NATIVE_STRUCTURED_OUTPUT or not isinstance(schema, dict):
+        return None
+    return _native_schema_from_json(orjson.dumps(schema).decode())
+
+@functools.lru_cache(maxsize=64)
+def _structured_instructions(schema_str: str) -> str:
+    """Prompt-only instructions for a schema; the text being analyzed stays out of them"""
+    return f"Respond with only a JSON object in this format, with no other text:\n\n{schema_str}"
+
+@functools.lru_cache(maxsize=64)
+def _native_instructions(schema_str: Optional[str]) -> str:
+    """Instructions when the provider enforces JSON; the schema is only described when it isn't enforced"""
+    instructions = "Analyze the text and respond with the requested fields as a JSON object."
+    if schema_str is not None:
+        instructions += f"\n\nJSON schema:\n{schema_str}"
+    return instructions
+
+# Output budget for structured output: a base plus a per-field allowance, larger for list fields
+_STRUCTURED_BASE_TOKENS = 25
+_STRUCTURED_FIELD_TOKENS = 25
+_STRUCTURED_LIST_FIELD_TOKENS = 60
+_STRUCTURED_MAX_TOKENS = 300
+
+def _structured_max_tokens(schema: Union[str, Dict[str, Any]]) -> int:
+    """max_tokens sized to the fields a schema asks for, capped at _STRUCTURED_MAX_TOKENS"""
+    if isinstance(schema, dict):
+        if schema.get("type") == "array":
+            return _STRUCTURED_MAX_TOKENS  # Open-ended number of items
+        properties = schema.get("properties", {}).values()
+        fields = len(properties)
+        list_fields = sum(1 for prop in properties if isinstance(prop, dict) and prop.get("type") == "array")
+    else:
+        fields = schema.count('":')
+        list_fields = schema.count("[")
+    
+    budget = (
+        _STRUCTURED_BASE_TOKENS
+        + (fields - list_fields) * _STRUCTURED_FIELD_TOKENS
+        + list_fields * _STRUCTURED_LIST_FIELD_TOKENS
+    )
+    return min(budget, _STRUCTURED_MAX_TOKENS)
+
+# Step-by-step instructions for generate_with_reasoning, sent as (part of) the system message
+# so they form a stable prefix across calls
+_COT_INSTRUCTIONS = (
+    "Reason step by step before answering: analyze the context, break the problem into parts, "
+    "consider alternative approaches, then draw a conclusion.\n"
+    "After your reasoning, give your final answer in a directly usable form, labeled FINAL OUTPUT:"
+)
+
+def cot_prefix(instructions: str) -> str:
+    """The fixed system prefix generate_with_reasoning sends ahead of cached context starting with instructions"""
+    return f"{_COT_INSTRUCTIONS}\n\n{instructions}"
+
+# System messages only vary by caller message and static context, so they're assembled once per combination
+@functools.lru_cache(maxsize=64)
+def _cot_system_message(system_message: Optional[str]) -> str:
+    return f"{system_message}\n\n{_COT_INSTRUCTIONS}" if system_message else _COT_INSTRUCTIONS
+
+@functools.lru_cache(maxsize=256)
+def _openai_cot_system(system_message: Optional[str], cached_context: Tuple[str, ...]) -> str:
+    return "\n\n".join([_cot_system_message(system_message), *cached_context])
+
+@functools.lru_cache(maxsize=256)
+def _anthropic_cot_system(
+    system_message: Optional[str],
+    cached_context: Tuple[str, ...]
+) -> Tuple[Dict[str, Any], ...]:
+    # A cache breakpoint after each block, so a change in a later block keeps the earlier prefix
+    return ({"type": "text", "text": _cot_system_message(system_message)},) + tuple(
+        {"type": "text", "text": block, "cache_control": {"type": "ephemeral"}}
+        for block in cached_context
+    )
+
+# Connection pool shared by every LLM SDK client in the process
+_llm_http_client: Optional[httpx.AsyncClient] = None
+
+def get_llm_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client used for LLM provider requests"""
+    global _llm_http_client
+    if _llm_http_client is None or _llm_http_client.is_closed:
+        _llm_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0),
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+    return _llm_http_client
+
+async def close_llm_http_client():
+    """Close the shared LLM HTTP client"""
+    global _llm_http_client
+    if _llm_http_client is not None:
+        await _llm_http_client.aclose()
+        _llm_http_client = None
+
+class RequestRateLimiter:
+    """Token bucket limiting how many requests start per minute"""
+    
+    def __init__(self, requests_per_minute: int):
+        self.capacity = requests_per_minute
+        self.tokens = float(requests_per_minute)
+        self.refill_per_second = requests_per_minute / 60.0
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.refill_per_second)
+
+# Process-wide limiter, created on first use when LLM_REQUESTS_PER_MINUTE is set
+_rate_limiter: Optional[RequestRateLimiter] = None
+
+def get_rate_limiter() -> Optional[RequestRateLimiter]:
+    """Get the shared request rate limiter, or None if rate limiting is disabled"""
+    global _rate_limiter
+    if _rate_limiter is None and settings.LLM_REQUESTS_PER_MINUTE > 0:
+        _rate_limiter = RequestRateLimiter(settings.LLM_REQUESTS_PER_MINUTE)
+    return _rate_limiter
+
 class CoTEngine:
     """
     Chain-of-Thought Engine for working with LLMs to generate step-by-step reasoning
@@ -30,25 +259,22 @@ class CoTEngine:
     
     def _initialize_openai(self):
         """Initialize OpenAI client"""
-        import openai
-        
-        openai.api_key = settings.OPENAI_API_KEY
-        self.client = openai.Client()
+        self.client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=get_llm_http_client(),
+            max_retries=settings.LLM_MAX_RETRIES  # Retries connection errors, 408/409/429 and 5xx, honoring Retry-After
+        )
         self.model = "gpt-4-turbo"  # Default model
     
     def _initialize_anthropic(self):
         """Initialize Anthropic client"""
-        import anthropic
-        
-        self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.client = anthropic.AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            http_client=get_llm_http_client(),
+            max_retries=settings.LLM_MAX_RETRIES
+        )
         self.model = "claude-3-opus-20240229"  # Default model
     
-    @backoff.on_exception(
-        backoff.expo,
-        Exception,
-        max_tries=3,
-        giveup=lambda e: "invalid" in str(e).lower()
-    )
     async def generate(self, prompt: str, system_message: Optional[str] = None) -> str:
         """
         Generate a response without explicit CoT reasoning
@@ -69,8 +295,7 @@ class CoTEngine:
                 
                 messages.append({"role": "user", "content": prompt})
                 
-                response = await asyncio.to_thread(
-                    self.client.chat.completions.create,
+                response = await self.client.chat.completions.create(
                     model=self.model,
                     messages=messages,
                     temperature=0.7
@@ -82,7 +307,7 @@ class CoTEngine:
                 message_content = []
                 
                 if system_message:
-                    message = self.client.messages.create(
+                    message = await self.client.messages.create(
                         model=self.model,
                         system=system_message,
                         messages=[{"role": "user", "content": prompt}],
@@ -90,7 +315,7 @@ class CoTEngine:
                         max_tokens=1024
                     )
                 else:
-                    message = self.client.messages.create(
+                    message = await self.client.messages.create(
                         model=self.model,
                         messages=[{"role": "user", "content": prompt}],
                         temperature=0.7,
@@ -103,76 +328,56 @@ class CoTEngine:
             logger.error(f"Error generating LLM response: {str(e)}", exc_info=True)
             raise
     
-    @backoff.on_exception(
-        backoff.expo,
-        Exception,
-        max_tries=3,
-        giveup=lambda e: "invalid" in str(e).lower()
-    )
-    async def generate_with_reasoning(self, prompt: str, system_message: Optional[str] = None) -> Dict[str, Any]:
+    async def generate_with_reasoning(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        cached_context: Optional[List[str]] = None,
+        stop_at_json_output: bool = False
+    ) -> Dict[str, Any]:
         """
         Generate a response with explicit Chain-of-Thought reasoning
         
         Args:
             prompt: The prompt to send to the LLM
             system_message: Optional system message to set context
+            cached_context: Optional static context blocks (instructions, survey details) sent in the
+                system message ahead of the prompt, marked for provider prompt caching
+            stop_at_json_output: Stream the response and stop reading once the final output holds a
+                complete JSON object, for prompts whose answer is a JSON object
             
         Returns:
-            Dict: Contains 'reasoning' (the step-by-step thought process) and 'output' (the final answer)
+            Dict: Contains 'reasoning' (the step-by-step thought process), 'output' (the final answer)
+            and 'usage' (token counts, including prompt cache reads and writes)
         """
         try:
-            # Modify prompt to explicitly request CoT reasoning
-            cot_prompt = f"""
-{prompt}
-
-Step through your reasoning in detail before providing your final answer. 
-Think step-by-step through this problem:
-1. First, analyze the context and question carefully
-2. Break down the problem into parts if needed
-3. Explore different perspectives or approaches
-4. Draw a conclusion based on your reasoning
-
-After your reasoning, provide your final output in a format that can be directly used, labeled as FINAL OUTPUT:
-"""
+            if stop_at_json_output:
+                usage = {}
+                async with contextlib.aclosing(
+                    self.stream_with_reasoning(prompt, system_message, cached_context, usage)
+                ) as text_chunks:
+                    full_response, stopped_early = await self._read_reasoning_stream(text_chunks)
+                if stopped_early:
+                    self._count_unreported_usage(usage, prompt, system_message, cached_context, full_response)
             
-            if self.llm_provider == "openai":
-                messages = []
-                
-                if system_message:
-                    messages.append({"role": "system", "content": system_message})
-                
-                messages.append({"role": "user", "content": cot_prompt})
-                
-                response = await asyncio.to_thread(
-                    self.client.chat.completions.create,
-                    model=self.model,
-                    messages=messages,
-                    temperature=0.7
+            elif self.llm_provider == "openai":
+                response = await self.client.chat.completions.create(
+                    **self._reasoning_request_params(prompt, system_message, cached_context)
                 )
                 
                 full_response = response.choices[0].message.content
+                usage = self._openai_usage(response.usage)
             
             elif self.llm_provider == "anthropic":
-                if system_message:
-                    message = self.client.messages.create(
-                        model=self.model,
-                        system=system_message,
-                        messages=[{"role": "user", "content": cot_prompt}],
-                        temperature=0.7,
-                        max_tokens=2048
-                    )
-                else:
-                    message = self.client.messages.create(
-                        model=self.model,
-                        messages=[{"role": "user", "content": cot_prompt}],
-                        temperature=0.7,
-                        max_tokens=2048
-                    )
+                message = await self.client.messages.create(
+                    **self._reasoning_request_params(prompt, system_message, cached_context)
+                )
                 
                 full_response = message.content[0].text
+                usage = self._anthropic_usage(message.usage)
             
             # Split reasoning from final output
-            parts = re.split(r"FINAL OUTPUT:?", full_response, flags=re.IGNORECASE)
+            parts = _FINAL_OUTPUT_RE.split(full_response)
             
             if len(parts) >= 2:
                 reasoning = parts[0].strip()
@@ -184,13 +389,167 @@ After your reasoning, provide your final output in a format that can be directly
             
             return {
                 "reasoning": reasoning,
-                "output": output
+                "output": output,
+                "usage": usage
             }
             
         except Exception as e:
             logger.error(f"Error generating CoT response: {str(e)}", exc_info=True)
             raise
     
+    async def stream_with_reasoning(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        cached_context: Optional[List[str]] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a Chain-of-Thought response as text chunks
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            system_message: Optional system message to set context
+            cached_context: Optional static context blocks, as in generate_with_reasoning
+            usage: Optional dict updated with token counts once the provider reports them
+                (OpenAI only reports them at the end of the stream)
+            
+        Yields:
+            str: Response text as it arrives
+        """
+        request_params = self._reasoning_request_params(prompt, system_message, cached_context)
+        
+        if self.llm_provider == "openai":
+            stream = await self.client.chat.completions.create(
+                **request_params,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.usage is not None and usage is not None:
+                        usage.update(self._openai_usage(chunk.usage))
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+        
+        elif self.llm_provider == "anthropic":
+            async with self.client.messages.stream(**request_params) as stream:
+                try:
+                    async for text in stream.text_stream:
+                        yield text
+                finally:
+                    # Input and prompt cache counts arrive with the first event. If the stream failed
+                    # before it there is no snapshot, and the original error must propagate
+                    if usage is not None:
+                        try:
+                            snapshot = stream.current_message_snapshot
+                        except Exception:
+                            snapshot = None
+                        if snapshot is not None:
+                            usage.update(self._anthropic_usage(snapshot.usage))
+    
+    def _reasoning_request_params(
+        self,
+        prompt: str,
+        system_message: Optional[str],
+        cached_context: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Request parameters for a CoT completion"""
+        # The CoT instructions go in the system message, so the user prompt is sent as-is
+        cached_context = tuple(cached_context or ())
+        
+        if self.llm_provider == "openai":
+            # OpenAI caches identical prompt prefixes automatically
+            return {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": _openai_cot_system(system_message, cached_context)},
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.7
+            }
+        
+        system = _cot_system_message(system_message)
+        if cached_context:
+            system = list(_anthropic_cot_system(system_message, cached_context))
+        
+        return {
+            "model": self.model,
+            "system": system,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.7,
+            "max_tokens": 2048
+        }
+    
+    async def _read_reasoning_stream(self, text_chunks: AsyncIterator[str]) -> Tuple[str, bool]:
+        """
+        Accumulate a streamed CoT response until its final output holds a complete JSON object,
+        dropping anything after the object (or the whole response if the stream ends first).
+        Also returns whether reading stopped before the end of the stream
+        """
+        response = ""
+        async for chunk in text_chunks:
+            response += chunk
+            # Only a closing brace can complete the object
+            if "}" not in chunk:
+                continue
+            marker = _FINAL_OUTPUT_RE.search(response)
+            if marker is None:
+                continue
+            start_idx = response.find("{", marker.end())
+            end_idx = self._find_json_object_end(response, start_idx) if start_idx != -1 else -1
+            if end_idx != -1:
+                return response[:end_idx + 1], True
+        return response, False
+    
+    def _count_unreported_usage(
+        self,
+        usage: Dict[str, int],
+        prompt: str,
+        system_message: Optional[str],
+        cached_context: Optional[List[str]],
+        response_text: str
+    ) -> None:
+        """
+        Fill in the token counts of a stream closed before the provider reported them: OpenAI
+        sends usage only in the last chunk, and Anthropic's output count stops at the last snapshot
+        """
+        if "input_tokens" not in usage:
+            system = _openai_cot_system(system_message, tuple(cached_context or ()))
+            usage.update({
+                "input_tokens": count_tokens(system) + count_tokens(prompt),
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0
+            })
+        usage["output_tokens"] = max(usage.get("output_tokens", 0), count_tokens(response_text))
+    
+    @staticmethod
+    def _openai_usage(usage: Any) -> Dict[str, int]:
+        """Token counts from an OpenAI response"""
+        if usage is None:
+            return {}
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "input_tokens": usage.prompt_tokens,
+            "output_tokens": usage.completion_tokens,
+            "cache_creation_input_tokens": 0,  # OpenAI doesn't charge for cache writes
+            "cache_read_input_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0
+        }
+    
+    @staticmethod
+    def _anthropic_usage(usage: Any) -> Dict[str, int]:
+        """Token counts from an Anthropic response"""
+        if usage is None:
+            return {}
+        return {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0
+        }
+    
     async def generate_structured_output(
         self, 
         text: str, 
@@ -209,79 +568,322 @@ After your reasoning, provide your final output in a format that can be directly
             Dict: Structured output according to the provided schema
         """
         try:
-            # Handle both string and dict schemas
-            if isinstance(schema, dict):
-                schema_str = json.dumps(schema.get("properties", {}), indent=2)
-            else:
-                schema_str = str(schema)
+            # Repeated feedback often has an identical (or near-identical) earlier answer
+            schema_key = structured_output_cache.schema_key(schema)
+            limited_text = _safe_truncate(text, _STRUCTURED_TEXT_LIMIT)
+            cached = structured_output_cache.get(schema_key, limited_text)
+            if cached is not None:
+                return cached
             
-            # Simplified prompt for faster response
-            prompt = f"""
-You must respond with ONLY a valid JSON object that matches this exact format:
-
-{schema_str}
-
-Analyze this text: "{text[:100]}"
-
-Response must be valid JSON only - no explanations, no code blocks, no extra text.
-Start with {{ and end with }}.
-"""
+            request_params = self._structured_request_params(text, schema)
             
-            # Generate response with shorter content for speed
+            # Stream text responses and stop as soon as a complete JSON object has arrived
             if self.llm_provider == "openai":
-                response = await asyncio.to_thread(
-                    self.client.chat.completions.create,
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=300,  # Reduced for speed
-                    temperature=0.1  # Lower for consistency
-                )
-                raw_output = response.choices[0].message.content.strip()
+                stream = await self.client.chat.completions.create(**request_params, stream=True)
+                try:
+                    raw_output = await self._read_json_stream(
+                        chunk.choices[0].delta.content or ""
+                        async for chunk in stream
+                        if chunk.choices
+                    )
+                finally:
+                    await stream.close()
+                result = self._parse_json_output(raw_output.strip())
+            elif "tools" in request_params:  # anthropic tool use returns already-parsed input
+                response = await self.client.messages.create(**request_params)
+                result = self._anthropic_structured_output(response.content)
             else:  # anthropic
-                response = await self.client.messages.create(
-                    model=self.model,
-                    max_tokens=300,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.1
-                )
-                raw_output = response.content[0].text.strip()
+                async with self.client.messages.stream(**request_params) as stream:
+                    raw_output = await self._read_json_stream(stream.text_stream)
+                result = self._parse_json_output(raw_output.strip())
             
-            logger.debug(f"Raw LLM output: {raw_output}")
+            result = self._unwrap_native_result(result, schema)
+            if result is None:
+                return self._structured_fallback(schema, text)
             
-            # Clean and parse the output
-            cleaned_output = self._clean_output(raw_output)
-            
-            try:
-                result = json.loads(cleaned_output)
-                return result
-            except json.JSONDecodeError as e:
-                logger.warning(f"JSON parse error: {e}, trying fallback parsing")
-                
-                # Try to fix common JSON issues
-                fixed_output = self._fix_common_json_issues(cleaned_output)
-                try:
-                    result = json.loads(fixed_output)
-                    return result
-                except json.JSONDecodeError:
-                    logger.error(f"Could not parse JSON even after fixes: {fixed_output}")
-                    
-                    # Use fallback response
-                    fallback = self._get_fallback_response(schema, text)
-                    logger.info(f"Using fallback response: {fallback}")
-                    return fallback
+            structured_output_cache.put(schema_key, limited_text, result)
+            return result
             
         except Exception as e:
             logger.error(f"Error in generate_structured_output: {e}")
             return self._get_fallback_response(schema, text)
     
+    def _build_structured_prompt(
+        self,
+        text: str,
+        schema: Union[str, Dict[str, Any]],
+        native_schema: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, str]:
+        """
+        Build the prompt asking for a JSON object matching the schema
+        
+        Args:
+            text: The text to analyze
+            schema: JSON schema as string or dict defining the expected output structure
+            native_schema: Schema sent through the provider's native structured output, if any
+            
+        Returns:
+            Tuple[str, str]: Static instructions (identical for every call with this schema,
+            so providers can cache them as a prompt prefix) and the per-call user prompt
+        """
+        user_prompt = _ANALYZE_TEXT_PROMPT % _safe_truncate(text, _STRUCTURED_TEXT_LIMIT)
+        
+        if native_schema is not None:
+            if self.llm_provider == "openai" and not settings.OPENAI_STRICT_JSON_SCHEMA:
+                # JSON mode guarantees valid JSON but not the shape, so describe it
+                schema_str = _render_schema(orjson.dumps(native_schema).decode(), properties_only=False)
+                return _native_instructions(schema_str), user_prompt
+            # The provider enforces the schema, so no formatting instructions are needed
+            return _native_instructions(None), user_prompt
+        
+        # Handle both string and dict schemas
+        if isinstance(schema, dict):
+            schema_str = _render_schema(orjson.dumps(schema).decode())
+        else:
+            schema_str = str(schema)
+        
+        return _structured_instructions(schema_str), user_prompt
+    
+    def _structured_request_params(self, text: str, schema: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Request parameters for a structured output call, with the static instructions as a cacheable prefix"""
+        native_schema = _native_json_schema(schema)
+        instructions, prompt = self._build_structured_prompt(text, schema, native_schema)
+        params = {
+            "model": self.model,
+            "max_tokens": _structured_max_tokens(schema),  # Sized to the schema to cap tail latency
+            "temperature": 0.1  # Lower for consistency
+        }
+        
+        if self.llm_provider == "openai":
+            # OpenAI caches identical prompt prefixes automatically
+            params["messages"] = [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": prompt}
+            ]
+            if native_schema is not None:
+                if settings.OPENAI_STRICT_JSON_SCHEMA:
+                    params["response_format"] = {
+                        "type": "json_schema",
+                        "json_schema": {"name": "structured_output", "strict": True, "schema": native_schema}
+                    }
+                else:
+                    params["response_format"] = {"type": "json_object"}
+        else:  # anthropic
+            params["system"] = [
+                {"type": "text", "text": instructions, "cache_control": {"type": "ephemeral"}}
+            ]
+            params["messages"] = [{"role": "user", "content": prompt}]
+            if native_schema is not None:
+                # Forcing the tool makes the model return its input as an already-parsed object
+                params["tools"] = [{"name": _STRUCTURED_OUTPUT_TOOL, "input_schema": native_schema}]
+                params["tool_choice"] = {"type": "tool", "name": _STRUCTURED_OUTPUT_TOOL}
+        
+        return params
+    
+    async def _read_json_stream(self, text_chunks: AsyncIterator[str]) -> str:
+        """Accumulate streamed text until the first JSON object in it is complete (or the stream ends)"""
+        output = ""
+        async for chunk in text_chunks:
+            output += chunk
+            # Only a closing brace can complete the object
+            if "}" in chunk:
+                start_idx = output.find("{")
+                if start_idx != -1 and self._find_json_object_end(output, start_idx) != -1:
+                    break
+        return output
+    
+    def _anthropic_structured_output(self, content: List[Any]) -> Optional[Any]:
+        """Structured output from an Anthropic message: the forced tool input, or parsed text"""
+        for block in content:
+            if block.type == "tool_use":
+                return block.input
+        
+        text_blocks = [block.text for block in content if block.type == "text"]
+        return self._parse_json_output("".join(text_blocks).strip()) if text_blocks else None
+    
+    def _unwrap_native_result(self, result: Optional[Any], schema: Union[str, Dict[str, Any]]) -> Optional[Any]:
+        """Undo the object wrapper added for non-object schemas sent natively"""
+        if result is None or _native_json_schema(schema) is None or schema.get("type") == "object":
+            return result
+        return result.get(_NATIVE_RESULT_KEY) if isinstance(result, dict) else None
+    
+    def _parse_json_output(self, raw_output: str) -> Optional[Any]:
+        """Parse raw LLM output as JSON, repairing common issues; None if it can't be parsed"""
+        logger.debug(f"Raw LLM output: {raw_output}")
+        
+        # Clean and parse the output
+        cleaned_output = self._clean_output(raw_output)
+        
+        try:
+            return orjson.loads(cleaned_output)
+        except orjson.JSONDecodeError as e:
+            logger.warning(f"JSON parse error: {e}, trying fallback parsing")
+            
+            # Try to fix common JSON issues
+            fixed_output = self._fix_common_json_issues(cleaned_output)
+            try:
+                return orjson.loads(fixed_output)
+            except orjson.JSONDecodeError:
+                logger.error(f"Could not parse JSON even after fixes: {fixed_output}")
+                return None
+    
+    def _structured_fallback(self, schema: Union[str, Dict[str, Any]], text: str) -> Dict[str, Any]:
+        """Use the fallback response after output could not be parsed"""
+        fallback = self._get_fallback_response(schema, text)
+        logger.info(f"Using fallback response: {fallback}")
+        return fallback
+    
+    async def generate_structured_output_batch(
+        self,
+        items: List[Tuple[str, Union[str, Dict[str, Any]]]],
+        system_message: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = True,
+        offline: bool = False
+    ) -> List[Union[Dict[str, Any], BaseException]]:
+        """
+        Generate structured outputs for several (text, schema) pairs concurrently
+        
+        Args:
+            items: List of (text, schema) pairs
+            system_message: Optional system message to set context
+            max_concurrency: Maximum requests in flight (defaults to LLM_MAX_CONCURRENCY)
+            return_exceptions: Return exceptions in place of results instead of failing the batch
+            offline: Submit through the provider's batch API (cheaper, completes within 24h) and wait for it
+            
+        Returns:
+            List: Structured outputs in the same order as items
+        """
+        if offline:
+            batch_id = await self.submit_structured_batch(items)
+            return await self.poll_structured_batch(batch_id, items)
+        
+        semaphore = asyncio.Semaphore(max_concurrency or settings.LLM_MAX_CONCURRENCY)
+        rate_limiter = get_rate_limiter()
+        
+        async def generate_one(text: str, schema: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+            async with semaphore:
+                if rate_limiter is not None:
+                    await rate_limiter.acquire()
+                return await self.generate_structured_output(text, schema, system_message)
+        
+        return await asyncio.gather(
+            *(generate_one(text, schema) for text, schema in items),
+            return_exceptions=return_exceptions
+        )
+    
+    async def submit_structured_batch(self, items: List[Tuple[str, Union[str, Dict[str, Any]]]]) -> str:
+        """
+        Submit structured output requests to the provider's batch API
+        
+        Args:
+            items: List of (text, schema) pairs
+            
+        Returns:
+            str: Provider batch ID, to pass to poll_structured_batch
+        """
+        requests = [
+            (str(i), self._structured_request_params(text, schema))
+            for i, (text, schema) in enumerate(items)
+        ]
+        
+        if self.llm_provider == "openai":
+            lines = [
+                json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": params
+                })
+                for custom_id, params in requests
+            ]
+            input_file = await self.client.files.create(
+                file=("structured_batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = await self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        else:  # anthropic
+            batch = await self.client.messages.batches.create(
+                requests=[{"custom_id": custom_id, "params": params} for custom_id, params in requests]
+            )
+        
+        logger.info(f"Submitted structured output batch {batch.id} with {len(items)} requests")
+        return batch.id
+    
+    async def poll_structured_batch(
+        self,
+        batch_id: str,
+        items: List[Tuple[str, Union[str, Dict[str, Any]]]],
+        poll_interval: float = 60.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Wait for a submitted batch to finish and parse its results
+        
+        Args:
+            batch_id: ID returned by submit_structured_batch
+            items: The same (text, schema) pairs that were submitted
+            poll_interval: Seconds between status checks
+            
+        Returns:
+            List: Structured outputs in the same order as items (fallbacks for failed requests)
+        """
+        outputs: Dict[str, Any] = {}
+        
+        if self.llm_provider == "openai":
+            while True:
+                batch = await self.client.batches.retrieve(batch_id)
+                if batch.status in ("completed", "failed", "expired", "cancelled"):
+                    break
+                await asyncio.sleep(poll_interval)
+            
+            if batch.output_file_id:
+                content = await self.client.files.content(batch.output_file_id)
+                for line in content.text.splitlines():
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    body = (entry.get("response") or {}).get("body") or {}
+                    choices = body.get("choices") or []
+                    if choices:
+                        outputs[entry["custom_id"]] = self._parse_json_output(
+                            (choices[0]["message"]["content"] or "").strip()
+                        )
+        else:  # anthropic
+            while True:
+                batch = await self.client.messages.batches.retrieve(batch_id)
+                if batch.processing_status == "ended":
+                    break
+                await asyncio.sleep(poll_interval)
+            
+            async for entry in await self.client.messages.batches.results(batch_id):
+                if entry.result.type == "succeeded":
+                    outputs[entry.custom_id] = self._anthropic_structured_output(entry.result.message.content)
+        
+        logger.info(f"Structured output batch {batch_id} finished with {len(outputs)}/{len(items)} results")
+        
+        results = []
+        for i, (text, schema) in enumerate(items):
+            result = self._unwrap_native_result(outputs.get(str(i)), schema)
+            results.append(self._structured_fallback(schema, text) if result is None else result)
+        return results
+    
     def _clean_output(self, output):
-        """Clean the output by removing code blocks and extra text"""
-        # Remove code blocks
-        output = re.sub(r'```json\s*', '', output)
-        output = re.sub(r'```\s*', '', output)
+        """Clean the output by extracting the first balanced JSON object from it"""
+        start_idx = output.find('{')
+        if start_idx != -1:
+            end_idx = self._find_json_object_end(output, start_idx)
+            if end_idx != -1:
+                return output[start_idx:end_idx + 1]
+        
+        # No complete object (e.g. truncated output): remove code blocks and
+        # keep the widest {...} span so the JSON fixes can repair it
+        output = _CODEBLOCK_JSON_RE.sub('', output)
+        output = _CODEBLOCK_RE.sub('', output)
         
-        # Try to find JSON object boundaries
-        # Look for the first { and last }
         start_idx = output.find('{')
         end_idx = output.rfind('}')
         
@@ -290,6 +892,36 @@ Start with {{ and end with }}.
         
         return output.strip()
     
+    @staticmethod
+    def _find_json_object_end(output: str, start_idx: int) -> int:
+        """Index of the brace closing the object opened at start_idx, or -1 if it is never closed"""
+        depth = 0
+        in_string = False
+        escaped_idx = -1
+        
+        # Jump between structural characters instead of visiting every character
+        for match in _JSON_STRUCTURE_RE.finditer(output, start_idx):
+            idx = match.start()
+            if idx == escaped_idx:
+                continue
+            
+            char = match.group()
+            if in_string:
+                if char == '\\':
+                    escaped_idx = idx + 1
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    return idx
+        
+        return -1
+    
     def _fix_common_json_issues(self, json_str):
         """Fix common JSON formatting issues"""
         try:
@@ -304,12 +936,12 @@ Start with {{ and end with }}.
                 json_str = json_str + '}'
             
             # Fix single quotes to double quotes
-            json_str = re.sub(r"'([^']*)':", r'"\1":', json_str)
-            json_str = re.sub(r":\s*'([^']*)'", r': "\1"', json_str)
+            json_str = _SINGLE_Q_KEY_RE.sub(r'"\1":', json_str)
+            json_str = _SINGLE_Q_VAL_RE.sub(r': "\1"', json_str)
             
             # Remove trailing commas
-            json_str = re.sub(r',\s*}', '}', json_str)
-            json_str = re.sub(r',\s*]', ']', json_str)
+            json_str = _TRAIL_COMMA_OBJ_RE.sub('}', json_str)
+            json_str = _TRAIL_COMMA_ARR_RE.sub(']', json_str)
             
             return json_str
         except Exception:
@@ -318,25 +950,26 @@ Start with {{ and end with }}.
     def _get_fallback_response(self, schema, text):
         """Generate a fallback response when JSON parsing fails"""
         try:
-            # Convert schema to string if it's not already
-            schema_str = str(schema) if not isinstance(schema, str) else schema
-            
-            # Parse the schema to understand expected structure
-            if '"sentiment":' in schema_str and '"score":' in schema_str:
-                # This is a sentiment analysis schema
-                return {
-                    "sentiment": "neutral",
-                    "score": 0.0,
-                    "confidence": 0.5,
-                    "themes": [],
-                    "nuances": "Could not analyze due to API error"
-                }
+            # Fingerprint the schema by its field names to find a matching fallback
+            if isinstance(schema, dict):
+                fingerprint = tuple(sorted(schema.get("properties", {})))
             else:
-                # Generic fallback
-                return {
-                    "result": "error",
-                    "message": "Could not parse response",
-                    "input": text[:50] if text else ""
-                }
+                fingerprint = tuple(sorted(set(_SCHEMA_FIELD_RE.findall(str(schema)))))
+            
+            fallback = _FALLBACKS.get(fingerprint)
+            if fallback is not None:
+                return copy.deepcopy(fallback)
+            
+            # Generic fallback
+            return {
+                "result": "error",
+                "message": "Could not parse response",
+                "input": text[:50] if text else ""
+            }
         except Exception:
-            return {"error": "Fallback generation failed"}
\ No newline at end of file
+            return {"error": "Fallback generation failed"}
+
+@functools.lru_cache(maxsize=1)
+def get_cot_engine() -> CoTEngine:
+    """Get the process-wide CoT engine, so its client and connection pool are created once"""
+    return CoTEngine()
\ No newline at end of file
@@ -2,19 +2,83 @@
 Enhanced LLM Orchestrator with RAG optimization and token management
 """
 import logging
-import json
+import re
+import time
 import asyncio
-from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Awaitable, Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import openai
+import orjson
 
-from .orchestrator import LLMOrchestrator as BaseOrchestrator
-from ..rag.enhanced_retriever import EnhancedRAGRetriever, RetrievalContext, RetrievalStrategy
+from .cot_engine import cot_prefix
+from .orchestrator import LLMOrchestrator as BaseOrchestrator, _output_is_json_object, _run_in_background
+from ..rag.enhanced_retriever import EnhancedRAGRetriever, RetrievalContext, RetrievalResult, RetrievalStrategy
 from ..optimization.token_optimizer import TokenOptimizer, PromptType, TokenUsageRecord
 from ...core.logging import get_logger
 from ...core.config import get_settings
 
 logger = get_logger("services.llm.enhanced_orchestrator")
+settings = get_settings()
+
+# Knowledge kept for a prompt: at most this many chunks, within this share of the context budget
+MAX_KNOWLEDGE_CHUNKS = 5
+KNOWLEDGE_BUDGET_SHARE = 0.8
+
+# Conversation turns that go into a question prompt (the template keeps the last 5) and an analysis estimate
+PROMPT_HISTORY_TURNS = 5
+ANALYSIS_HISTORY_TURNS = 3
+
+# After a user's budget is denied, their requests get the fallback for this long without a budget check
+BUDGET_DENIAL_TTL_SECONDS = 60
+
+# Keyword lists for the rule-based fallback sentiment analysis
+POSITIVE_WORDS = frozenset(["good", "great", "excellent", "happy", "satisfied", "love", "amazing"])
+NEGATIVE_WORDS = frozenset(["bad", "terrible", "awful", "hate", "disappointed", "poor", "horrible"])
+
+# One case-insensitive scan finds every keyword; the lookahead lets matches overlap
+_SENTIMENT_WORD_RE = re.compile(
+    "(?=(" + "|".join(sorted(POSITIVE_WORDS | NEGATIVE_WORDS)) + "))",
+    re.IGNORECASE
+)
+
+# Answers for the rule-based branching conditions
+_INTEGER_RE = re.compile(r"\s*([+-]?\d+)\s*")
+_YES_RE = re.compile(r"\b(?:yes|y|1|true|correct)\b", re.IGNORECASE)
+_NO_RE = re.compile(r"\b(?:no|n|0|false|incorrect)\b", re.IGNORECASE)
+
+def _log_tracebacks() -> bool:
+    """
+    Whether error logs on the request paths carry tracebacks. Failures there fall back to a
+    simpler result and aren't rare under load, so full tracebacks are kept for DEBUG.
+    """
+    return logger.isEnabledFor(logging.DEBUG)
+
+@dataclass(frozen=True)
+class KnowledgeChunk:
+    """A retrieved document chunk that can go into a prompt"""
+    content: str
+    source_document: str
+    relevance_score: float
+    token_count: int
+
+@dataclass(frozen=True)
+class UsageProfile:
+    """The usage analytics figures the optimization score and recommendations are based on"""
+    cache_hit_rate: float
+    daily_avg_tokens: float
+    sentiment_share: float
+    
+    @classmethod
+    def from_analytics(cls, analytics: Dict[str, Any]) -> "UsageProfile":
+        total_tokens = analytics.get("total_tokens", 0)
+        sentiment_tokens = analytics.get("type_breakdown", {}).get("sentiment_analysis", {}).get("tokens", 0)
+        return cls(
+            cache_hit_rate=analytics.get("cache_hit_rate", 0),
+            daily_avg_tokens=total_tokens / max(1, len(analytics.get("daily_breakdown", {}))),
+            sentiment_share=sentiment_tokens / (total_tokens or 1)
+        )
 
 class EnhancedLLMOrchestrator(BaseOrchestrator):
     """
@@ -26,6 +90,18 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         self.rag_retriever = EnhancedRAGRetriever()
         self.token_optimizer = TokenOptimizer()
         
+        # The CoT prefix (reasoning and task instructions) is fixed per prompt type, so it's counted once
+        self._cot_prefix_tokens = {
+            prompt_type: self.token_optimizer.estimate_tokens(cot_prefix(instructions))
+            for prompt_type, instructions in (
+                (PromptType.SURVEY_GENERATION, self.prompt_templates.SURVEY_QUESTION_INSTRUCTIONS),
+                (PromptType.SENTIMENT_ANALYSIS, self.prompt_templates.RESPONSE_ANALYSIS_INSTRUCTIONS)
+            )
+        }
+        
+        # user_id -> (monotonic expiry, reason) of recent budget denials
+        self._budget_denials: Dict[str, Tuple[float, str]] = {}
+        
     async def generate_question_prompt_optimized(
         self,
         question: Dict[str, Any],
@@ -36,42 +112,49 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         """
         Generate optimized question prompt with RAG and token management
         """
+        reserved_tokens = 0  # Budget reserved for this request that nothing has reconciled yet
         try:
-            # Step 1: Check token budget
+            # Steps 1-2: Reserve token budget and retrieve knowledge in one pass
             estimated_tokens = self._estimate_prompt_tokens(question, conversation_history)
-            budget_allowed, budget_reason = await self.token_optimizer.check_token_budget(
-                user_id, estimated_tokens, "survey_generation"
-            )
-            
-            if not budget_allowed:
-                logger.warning(f"Token budget exceeded for user {user_id}: {budget_reason}")
-                # Return simplified prompt if budget exceeded
+            denial_reason = self._fast_budget_denial(user_id, estimated_tokens)
+            if denial_reason:
+                logger.warning("Token budget exceeded for user %s: %s", user_id, denial_reason)
                 return await self._generate_fallback_prompt(question)
             
-            # Step 2: Enhanced knowledge retrieval
-            retrieval_context = RetrievalContext(
-                query=question.get("text", ""),
-                conversation_history=conversation_history,
-                user_id=user_id,
-                survey_context=survey,
+            retrieval_strategy = RetrievalStrategy.ADAPTIVE
+            retrieval = self._retrieve_knowledge(
+                question.get("text", ""),
+                RetrievalContext(user_id=user_id, conversation_history=conversation_history),
                 max_tokens=min(estimated_tokens // 2, 1000),  # Use half budget for context
-                strategy=RetrievalStrategy.ADAPTIVE
+                strategy=retrieval_strategy
             )
             
-            retrieved_knowledge = await self.rag_retriever.retrieve_optimized_context(
-                retrieval_context
+            budget_allowed, budget_reason, retrieved_knowledge = await self._unified_request_pass(
+                user_id, "survey_generation", estimated_tokens, retrieval
             )
             
-            # Step 3: Optimize prompt for token efficiency
+            if not budget_allowed:
+                logger.warning("Token budget exceeded for user %s: %s", user_id, budget_reason)
+                # Return simplified prompt if budget exceeded
+                return await self._generate_fallback_prompt(question)
+            reserved_tokens = estimated_tokens
+            
+            # Step 3: Optimize prompt for token efficiency. Instructions and survey details are the
+            # same on every turn, so they're sent as a cached prefix ahead of the history and knowledge
             base_prompt = self.prompt_templates.survey_question_prompt(
                 question,
                 conversation_history,
-                [{"content": r.content, "source": r.source_document} for r in retrieved_knowledge]
+                [{"text": r.content, "source": r.source_document} for r in retrieved_knowledge],
+                include_instructions=False
             )
+            cached_context = [
+                self.prompt_templates.SURVEY_QUESTION_INSTRUCTIONS,
+                self.prompt_templates.survey_system_prompt(survey)
+            ]
             
             optimized_prompt, final_tokens = await self.token_optimizer.optimize_prompt(
                 base_prompt,
-                PromptType.SURVEY_QUESTION,
+                PromptType.QUESTION_GENERATION,
                 context={
                     "question_type": question.get("question_type"),
                     "survey_title": survey.get("title"),
@@ -79,22 +162,30 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
                 }
             )
             
-            # Step 4: Generate with CoT reasoning
-            cot_result = await self.cot_engine.generate_with_reasoning(optimized_prompt)
+            # Step 4: Generate with CoT reasoning, unless an equivalent exchange was answered recently
+            cot_result, response_cached = await self._generate_with_reasoning_cached(
+                self._reasoning_cache_namespace("survey_generation", survey, question),
+                "\n".join(msg.get("text", "") for msg in conversation_history[-PROMPT_HISTORY_TURNS:]),
+                optimized_prompt,
+                cached_context
+            )
             
-            # Step 5: Record token usage
+            # Step 5: Record token usage without delaying the response
             prompt_hash = self.token_optimizer._generate_prompt_hash(
                 optimized_prompt, 
                 {"user_id": user_id, "question_id": question.get("id")}
             )
             
-            await self.token_optimizer.record_token_usage(
+            _run_in_background(self.token_optimizer.record_token_usage(
                 user_id=user_id,
                 request_type="survey_generation",
-                tokens_used=final_tokens,
+                tokens_used=self._actual_tokens(cot_result, response_cached, final_tokens),
                 prompt_hash=prompt_hash,
-                response_cached=False  # Could implement response caching too
-            )
+                response_cached=response_cached,
+                reserved_tokens=reserved_tokens,
+                **self._prompt_cache_usage(cot_result, response_cached)
+            ))
+            reserved_tokens = 0  # Reconciled by record_token_usage
             
             # Step 6: Return enhanced result
             question_text = cot_result.get("output", question["voice_prompt"])
@@ -103,26 +194,19 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
                 "text": question_text,
                 "original_question": question,
                 "cot_reasoning": cot_result.get("reasoning", ""),
-                "retrieved_knowledge": [
-                    {
-                        "content": r.content,
-                        "source": r.source_document,
-                        "relevance_score": r.relevance_score,
-                        "token_count": r.token_count
-                    }
-                    for r in retrieved_knowledge
-                ],
+                "retrieved_knowledge": self._knowledge_columns(retrieved_knowledge),
                 "optimization_metadata": {
                     "original_tokens": estimated_tokens,
                     "optimized_tokens": final_tokens,
                     "token_savings": estimated_tokens - final_tokens,
                     "knowledge_sources": len(retrieved_knowledge),
-                    "retrieval_strategy": retrieval_context.strategy.value
+                    "retrieval_strategy": retrieval_strategy.value
                 }
             }
             
         except Exception as e:
-            logger.error(f"Error in optimized question generation: {str(e)}", exc_info=True)
+            logger.error("Error in optimized question generation: %s", e, exc_info=_log_tracebacks())
+            self._release_reservation(user_id, "survey_generation", reserved_tokens)
             return await self._generate_fallback_prompt(question)
     
     async def analyze_response_optimized(
@@ -136,38 +220,43 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         """
         Analyze response with enhanced RAG and token optimization
         """
+        reserved_tokens = 0  # Budget reserved for this request that nothing has reconciled yet
         try:
-            # Step 1: Check token budget
+            # Steps 1-2: Reserve token budget and retrieve contextual knowledge in one pass
             estimated_tokens = self._estimate_analysis_tokens(question, response, conversation_history)
-            budget_allowed, budget_reason = await self.token_optimizer.check_token_budget(
-                user_id, estimated_tokens, "sentiment_analysis"
-            )
-            
-            if not budget_allowed:
-                logger.warning(f"Token budget exceeded for analysis: {budget_reason}")
+            denial_reason = self._fast_budget_denial(user_id, estimated_tokens)
+            if denial_reason:
+                logger.warning("Token budget exceeded for analysis: %s", denial_reason)
                 return await self._generate_fallback_analysis(question, response)
             
-            # Step 2: Contextual knowledge retrieval
-            retrieval_context = RetrievalContext(
-                query=f"{question.get('text', '')} {response}",
-                conversation_history=conversation_history,
-                user_id=user_id,
-                survey_context=survey,
+            retrieval = self._retrieve_knowledge(
+                f"{question.get('text', '')} {response}",
+                RetrievalContext(user_id=user_id, conversation_history=conversation_history),
                 max_tokens=min(estimated_tokens // 3, 800),
                 strategy=RetrievalStrategy.CONTEXTUAL
             )
             
-            retrieved_knowledge = await self.rag_retriever.retrieve_optimized_context(
-                retrieval_context
+            budget_allowed, budget_reason, retrieved_knowledge = await self._unified_request_pass(
+                user_id, "sentiment_analysis", estimated_tokens, retrieval
             )
             
-            # Step 3: Optimize analysis prompt
+            if not budget_allowed:
+                logger.warning("Token budget exceeded for analysis: %s", budget_reason)
+                return await self._generate_fallback_analysis(question, response)
+            reserved_tokens = estimated_tokens
+            
+            # Step 3: Optimize analysis prompt, with the static parts as a cached prefix
             base_prompt = self.prompt_templates.response_analysis_prompt(
                 question,
                 response,
                 conversation_history,
-                [{"content": r.content, "source": r.source_document} for r in retrieved_knowledge]
+                [{"text": r.content, "source": r.source_document} for r in retrieved_knowledge],
+                include_instructions=False
             )
+            cached_context = [
+                self.prompt_templates.RESPONSE_ANALYSIS_INSTRUCTIONS,
+                self.prompt_templates.survey_system_prompt(survey)
+            ]
             
             optimized_prompt, final_tokens = await self.token_optimizer.optimize_prompt(
                 base_prompt,
@@ -179,24 +268,38 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
                 }
             )
             
-            # Step 4: Generate analysis with CoT
-            cot_result = await self.cot_engine.generate_with_reasoning(optimized_prompt)
+            # Step 4: Generate analysis with CoT, reusing the analysis of an identical response
+            # (exact matches only, as in analyze_response). The analysis is a JSON object, so it's
+            # parsed as soon as the object is complete
+            cot_result, response_cached = await self._generate_with_reasoning_cached(
+                self._reasoning_cache_namespace("sentiment_analysis", survey, question),
+                response,
+                optimized_prompt,
+                cached_context,
+                stop_at_json_output=True,
+                semantic=False,
+                cacheable=_output_is_json_object
+            )
             
             # Step 5: Parse and enhance analysis
             analysis = await self._parse_analysis_result(cot_result, question, response)
             
-            # Step 6: Record usage
+            # Step 6: Record usage without delaying the response
             prompt_hash = self.token_optimizer._generate_prompt_hash(
                 optimized_prompt, 
                 {"user_id": user_id, "response": response[:100]}
             )
             
-            await self.token_optimizer.record_token_usage(
+            _run_in_background(self.token_optimizer.record_token_usage(
                 user_id=user_id,
                 request_type="sentiment_analysis",
-                tokens_used=final_tokens,
-                prompt_hash=prompt_hash
-            )
+                tokens_used=self._actual_tokens(cot_result, response_cached, final_tokens),
+                prompt_hash=prompt_hash,
+                response_cached=response_cached,
+                reserved_tokens=reserved_tokens,
+                **self._prompt_cache_usage(cot_result, response_cached)
+            ))
+            reserved_tokens = 0  # Reconciled by record_token_usage
             
             # Add optimization metadata
             analysis["optimization_metadata"] = {
@@ -209,7 +312,8 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
             return analysis
             
         except Exception as e:
-            logger.error(f"Error in optimized response analysis: {str(e)}", exc_info=True)
+            logger.error("Error in optimized response analysis: %s", e, exc_info=_log_tracebacks())
+            self._release_reservation(user_id, "sentiment_analysis", reserved_tokens)
             return await self._generate_fallback_analysis(question, response)
     
     async def generate_follow_up_optimized(
@@ -225,30 +329,25 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         """
         try:
             # Enhanced follow-up generation with context-aware retrieval
-            retrieval_context = RetrievalContext(
-                query=f"follow up questions for {response} regarding {question.get('text', '')}",
-                conversation_history=conversation_history,
-                user_id=user_id,
+            retrieved_knowledge = await self._retrieve_knowledge(
+                f"follow up questions for {response} regarding {question.get('text', '')}",
+                RetrievalContext(user_id=user_id, conversation_history=conversation_history),
                 max_tokens=500,
                 strategy=RetrievalStrategy.HYBRID
             )
             
-            retrieved_knowledge = await self.rag_retriever.retrieve_optimized_context(
-                retrieval_context
-            )
-            
             # Generate contextual follow-up
             follow_up_prompt = self.prompt_templates.follow_up_prompt(
                 question,
                 response,
                 analysis,
                 conversation_history,
-                [{"content": r.content} for r in retrieved_knowledge]
+                [{"text": r.content, "source": r.source_document} for r in retrieved_knowledge]
             )
             
             optimized_prompt, tokens = await self.token_optimizer.optimize_prompt(
                 follow_up_prompt,
-                PromptType.RESPONSE_GENERATION
+                PromptType.FOLLOW_UP_GENERATION
             )
             
             cot_result = await self.cot_engine.generate_with_reasoning(optimized_prompt)
@@ -263,7 +362,7 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
             }
             
         except Exception as e:
-            logger.error(f"Error generating optimized follow-up: {str(e)}")
+            logger.error("Error generating optimized follow-up: %s", e)
             return {"text": "Thank you for your response.", "error": str(e)}
     
     async def batch_sentiment_analysis(
@@ -277,29 +376,32 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         try:
             # Group responses for batch processing
             batch_size = 10  # Optimal batch size for token efficiency
-            results = []
-            
-            for i in range(0, len(responses), batch_size):
-                batch = responses[i:i + batch_size]
-                
-                # Create batch prompt
-                batch_texts = [r["text"] for r in batch]
-                batch_prompt = self._create_batch_sentiment_prompt(batch_texts)
-                
-                # Optimize prompt
-                optimized_prompt, tokens = await self.token_optimizer.optimize_prompt(
-                    batch_prompt,
-                    PromptType.SENTIMENT_ANALYSIS
-                )
-                
-                # Process batch
-                cot_result = await self.cot_engine.generate_with_reasoning(optimized_prompt)
-                batch_results = self._parse_batch_sentiment_results(cot_result, batch)
-                
-                results.extend(batch_results)
-                
-                # Record usage
-                await self.token_optimizer.record_token_usage(
+            batches = [responses[i:i + batch_size] for i in range(0, len(responses), batch_size)]
+            semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+            
+            async def process_batch(batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], str, int]:
+                async with semaphore:
+                    # Create batch prompt
+                    batch_texts = [r["text"] for r in batch]
+                    batch_prompt = self._create_batch_sentiment_prompt(batch_texts)
+                    
+                    # Optimize prompt
+                    optimized_prompt, tokens = await self.token_optimizer.optimize_prompt(
+                        batch_prompt,
+                        PromptType.SENTIMENT_ANALYSIS
+                    )
+                    
+                    # Process batch
+                    cot_result = await self.cot_engine.generate_with_reasoning(optimized_prompt)
+                    tokens = self._actual_tokens(cot_result, False, tokens)
+                    return self._parse_batch_sentiment_results(cot_result, batch), optimized_prompt, tokens
+            
+            # All batches are in flight at once, bounded by the semaphore
+            batch_outputs = await asyncio.gather(*(process_batch(batch) for batch in batches))
+            
+            # Record usage for every batch in one sweep
+            await asyncio.gather(*(
+                self.token_optimizer.record_token_usage(
                     user_id=user_id,
                     request_type="batch_sentiment_analysis",
                     tokens_used=tokens,
@@ -308,11 +410,13 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
                         {"batch_size": len(batch)}
                     )
                 )
+                for batch, (_, optimized_prompt, tokens) in zip(batches, batch_outputs)
+            ))
             
-            return results
+            return [result for batch_results, _, _ in batch_outputs for result in batch_results]
             
         except Exception as e:
-            logger.error(f"Error in batch sentiment analysis: {str(e)}")
+            logger.error("Error in batch sentiment analysis: %s", e, exc_info=_log_tracebacks())
             return [{"sentiment": "neutral", "confidence": 0.5} for _ in responses]
     
     async def get_optimization_insights(self, user_id: str) -> Dict[str, Any]:
@@ -324,7 +428,7 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
             analytics = await self.token_optimizer.get_usage_analytics(user_id, days=30)
             
             # Get optimization suggestions
-            suggestions = await self.token_optimizer.suggest_optimizations(user_id)
+            suggestions = await self.token_optimizer.get_optimization_insights(user_id)
             
             # Calculate potential savings
             total_tokens = analytics.get("total_tokens", 0)
@@ -337,19 +441,167 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
                 "percentage": 30
             }
             
+            profile = UsageProfile.from_analytics(analytics)
+            score = self._calculate_optimization_score(profile)
+            
             return {
                 "current_usage": analytics,
                 "optimization_suggestions": suggestions,
                 "potential_savings": potential_savings,
-                "optimization_score": self._calculate_optimization_score(analytics),
-                "recommendations": self._generate_recommendations(analytics, suggestions)
+                "optimization_score": score,
+                "recommendations": self._generate_recommendations(profile, score, suggestions)
             }
             
         except Exception as e:
-            logger.error(f"Error getting optimization insights: {str(e)}")
+            logger.error("Error getting optimization insights: %s", e)
             return {}
     
     # Private helper methods
+    def _fast_budget_denial(self, user_id: str, estimated_tokens: int) -> Optional[str]:
+        """
+        Reason to deny a request without a DB round trip or retrieval: it's over the
+        per-request limit, or the user's budget was denied within the last
+        BUDGET_DENIAL_TTL_SECONDS. None if the request needs a full budget check.
+        """
+        per_request_limit = self.token_optimizer.budget.per_request_limit
+        if estimated_tokens > per_request_limit:
+            return f"Request exceeds per-request limit ({estimated_tokens} > {per_request_limit})"
+        
+        denial = self._budget_denials.get(user_id)
+        if denial is None:
+            return None
+        if denial[0] > time.monotonic():
+            return denial[1]
+        
+        del self._budget_denials[user_id]
+        return None
+    
+    async def _unified_request_pass(
+        self,
+        user_id: str,
+        request_type: str,
+        estimated_tokens: int,
+        retrieval: Awaitable[List[KnowledgeChunk]]
+    ) -> Tuple[bool, str, List[KnowledgeChunk]]:
+        """
+        Reserve the token budget and retrieve knowledge for a request in a single pass
+        
+        Args:
+            user_id: User the tokens are charged to
+            request_type: Request type the reservation is recorded under
+            estimated_tokens: Tokens to reserve
+            retrieval: Knowledge retrieval for the request (see _retrieve_knowledge)
+            
+        Returns:
+            Tuple: Whether the budget allows the request, the budget decision's reason,
+            and the selected knowledge (empty when the budget is denied)
+        """
+        # Budget check and usage reservation are one atomic DB update, overlapped with retrieval
+        budget_task = asyncio.create_task(
+            self.token_optimizer.check_and_reserve(user_id, estimated_tokens, request_type)
+        )
+        retrieval_task = asyncio.ensure_future(retrieval)
+        
+        try:
+            budget_allowed, budget_reason = await budget_task
+        except Exception:
+            retrieval_task.cancel()
+            raise
+        
+        if not budget_allowed:
+            retrieval_task.cancel()
+            self._budget_denials[user_id] = (time.monotonic() + BUDGET_DENIAL_TTL_SECONDS, budget_reason)
+            return False, budget_reason, []
+        
+        try:
+            return True, budget_reason, await retrieval_task
+        except Exception:
+            # The caller falls back without making the request, so the reservation is given back
+            self._release_reservation(user_id, request_type, estimated_tokens)
+            raise
+    
+    def _release_reservation(self, user_id: str, request_type: str, reserved_tokens: int) -> None:
+        """Give back budget reserved for a request that fell back before its usage was recorded"""
+        if reserved_tokens:
+            _run_in_background(
+                self.token_optimizer.reconcile_reservation(user_id, request_type, reserved_tokens, 0)
+            )
+    
+    async def _retrieve_knowledge(
+        self,
+        query: str,
+        retrieval_context: RetrievalContext,
+        max_tokens: int,
+        strategy: RetrievalStrategy
+    ) -> List[KnowledgeChunk]:
+        """Retrieve documents for a query and select the chunks that go into the prompt"""
+        result: RetrievalResult = await self.rag_retriever.retrieve_optimized_context(
+            query,
+            retrieval_context,
+            max_tokens=max_tokens,
+            strategy=strategy
+        )
+        chunks = [
+            KnowledgeChunk(
+                content=doc.get("content", ""),
+                source_document=doc.get("document_name", "Unknown"),
+                relevance_score=doc.get("relevance_score", 0.0),
+                token_count=self.token_optimizer.estimate_tokens(doc.get("content", ""))
+            )
+            for doc in result.documents or []
+        ]
+        return self._select_knowledge(chunks, max_tokens)
+    
+    def _select_knowledge(self, retrieved_knowledge: List[KnowledgeChunk], max_tokens: int) -> List[KnowledgeChunk]:
+        """
+        Keep the most relevant chunks that fit the context budget, instead of every hit.
+        Kept chunks are ordered by source so the knowledge block is identical whenever
+        the same chunks are selected, keeping it cacheable across turns.
+        """
+        token_budget = max_tokens * KNOWLEDGE_BUDGET_SHARE
+        selected = []
+        used_tokens = 0
+        
+        for chunk in sorted(retrieved_knowledge, key=lambda r: r.relevance_score, reverse=True):
+            if len(selected) == MAX_KNOWLEDGE_CHUNKS:
+                break
+            if used_tokens + chunk.token_count > token_budget:
+                continue
+            selected.append(chunk)
+            used_tokens += chunk.token_count
+        
+        selected.sort(key=lambda r: (str(r.source_document), -r.relevance_score))
+        return selected
+    
+    def _knowledge_columns(self, retrieved_knowledge: List[KnowledgeChunk]) -> Dict[str, List[Any]]:
+        """Retrieved chunks as parallel lists (index i across the lists is chunk i), not one dict per chunk"""
+        return {
+            "contents": list(map(attrgetter("content"), retrieved_knowledge)),
+            "sources": list(map(attrgetter("source_document"), retrieved_knowledge)),
+            "relevance_scores": list(map(attrgetter("relevance_score"), retrieved_knowledge)),
+            "token_counts": list(map(attrgetter("token_count"), retrieved_knowledge))
+        }
+    
+    def _actual_tokens(self, cot_result: Dict[str, Any], response_cached: bool, prompt_tokens: int) -> int:
+        """
+        Input plus output tokens a CoT call used: none for a cached result, and the prompt
+        estimate if the provider reported no usage
+        """
+        if response_cached:
+            return 0
+        usage = cot_result.get("usage") or {}
+        if "input_tokens" not in usage:
+            return prompt_tokens
+        return usage["input_tokens"] + usage["output_tokens"]
+    
+    def _prompt_cache_usage(self, cot_result: Dict[str, Any], response_cached: bool) -> Dict[str, int]:
+        """Provider prompt cache token counts to record (none when the result came from our cache)"""
+        usage = {} if response_cached else cot_result.get("usage", {})
+        return {
+            "cache_creation_input_tokens": usage.get("cache_creation_input_tokens", 0),
+            "cache_read_input_tokens": usage.get("cache_read_input_tokens", 0)
+        }
+    
     async def _generate_fallback_prompt(self, question: Dict[str, Any]) -> Dict[str, Any]:
         """Generate simple fallback prompt when optimization fails"""
         return {
@@ -380,12 +632,9 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
     
     def _simple_sentiment_analysis(self, text: str) -> Dict[str, Any]:
         """Simple rule-based sentiment analysis as fallback"""
-        positive_words = ["good", "great", "excellent", "happy", "satisfied", "love", "amazing"]
-        negative_words = ["bad", "terrible", "awful", "hate", "disappointed", "poor", "horrible"]
-        
-        text_lower = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
+        found = {match.group(1).lower() for match in _SENTIMENT_WORD_RE.finditer(text)}
+        positive_count = len(found & POSITIVE_WORDS)
+        negative_count = len(found & NEGATIVE_WORDS)
         
         if positive_count > negative_count:
             return {"sentiment": "positive", "score": 0.7}
@@ -394,28 +643,34 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         else:
             return {"sentiment": "neutral", "score": 0.0}
     
+    def _batch_simple_sentiment(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Rule-based fallback sentiment for several texts, one keyword scan per text"""
+        return [self._simple_sentiment_analysis(text) for text in texts]
+    
     def _determine_simple_condition(
         self, 
         question: Dict[str, Any], 
         response: str
     ) -> Optional[str]:
         """Simple condition determination for branching logic"""
-        if question.get("question_type") == "numeric":
-            try:
-                rating = int(response.strip())
-                if rating <= 2:
-                    return "1-2"
-                elif rating == 3:
-                    return "3"
-                else:
-                    return "4-5"
-            except ValueError:
+        question_type = question.get("question_type")
+        
+        if question_type == "numeric":
+            match = _INTEGER_RE.fullmatch(response)
+            if not match:
                 return None
-        elif question.get("question_type") == "yes_no":
-            response_lower = response.lower().strip()
-            if any(word in response_lower for word in ["yes", "y", "1", "true", "correct"]):
+            rating = int(match.group(1))
+            if rating <= 2:
+                return "1-2"
+            elif rating == 3:
+                return "3"
+            else:
+                return "4-5"
+        elif question_type == "yes_no":
+            # Whole words only, so e.g. the "y" in "not really" isn't read as a yes
+            if _YES_RE.search(response):
                 return "yes"
-            elif any(word in response_lower for word in ["no", "n", "0", "false", "incorrect"]):
+            elif _NO_RE.search(response):
                 return "no"
         
         return None
@@ -426,11 +681,14 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         conversation_history: List[Dict[str, Any]]
     ) -> int:
         """Estimate tokens needed for prompt generation"""
-        base_tokens = 200  # Base prompt template
-        question_tokens = len(str(question).split()) * 1.3
-        history_tokens = sum(len(str(msg).split()) for msg in conversation_history) * 1.3
+        base_tokens = self._cot_prefix_tokens[PromptType.SURVEY_GENERATION]
+        texts = [
+            question.get("text", ""),
+            *(msg.get("text", "") for msg in conversation_history[-PROMPT_HISTORY_TURNS:])
+        ]
         
-        return int(base_tokens + question_tokens + history_tokens)
+        # Summed per field: earlier turns hit the token count cache, so only the new turn is tokenized
+        return base_tokens + sum(map(self.token_optimizer.estimate_tokens, texts))
     
     def _estimate_analysis_tokens(
         self, 
@@ -439,12 +697,14 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         conversation_history: List[Dict[str, Any]]
     ) -> int:
         """Estimate tokens needed for response analysis"""
-        base_tokens = 150
-        question_tokens = len(str(question).split()) * 1.3
-        response_tokens = len(response.split()) * 1.3
-        history_tokens = sum(len(str(msg).split()) for msg in conversation_history[-3:]) * 1.3
+        base_tokens = self._cot_prefix_tokens[PromptType.SENTIMENT_ANALYSIS]
+        texts = [
+            question.get("text", ""),
+            response,
+            *(msg.get("text", "") for msg in conversation_history[-ANALYSIS_HISTORY_TURNS:])
+        ]
         
-        return int(base_tokens + question_tokens + response_tokens + history_tokens)
+        return base_tokens + sum(map(self.token_optimizer.estimate_tokens, texts))
     
     async def _parse_analysis_result(
         self, 
@@ -455,8 +715,8 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         """Parse and validate analysis result from LLM"""
         try:
             analysis_str = cot_result.get("output", "{}")
-            analysis = json.loads(analysis_str)
-        except json.JSONDecodeError:
+            analysis = orjson.loads(analysis_str)
+        except orjson.JSONDecodeError:
             # Fallback analysis
             analysis = await self._generate_fallback_analysis(question, response)
         
@@ -507,78 +767,70 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
         """Parse batch sentiment analysis results"""
         try:
             results_str = cot_result.get("output", "[]")
-            results = json.loads(results_str)
+            results = orjson.loads(results_str)
             
             # Validate and match with original batch
             parsed_results = []
-            for i, item in enumerate(batch):
-                if i < len(results):
-                    result = results[i]
-                    parsed_results.append({
-                        **item,
-                        "sentiment": result.get("sentiment", "neutral"),
-                        "sentiment_score": result.get("score", 0.0),
-                        "batch_processed": True
-                    })
-                else:
-                    # Fallback for missing results
-                    fallback = self._simple_sentiment_analysis(item.get("text", ""))
-                    parsed_results.append({
-                        **item,
-                        **fallback,
-                        "batch_processed": False
-                    })
+            for item, result in zip(batch, results):
+                parsed_results.append({
+                    **item,
+                    "sentiment": result.get("sentiment", "neutral"),
+                    "sentiment_score": result.get("score", 0.0),
+                    "batch_processed": True
+                })
+            
+            # Fallback for missing results
+            missing = batch[len(parsed_results):]
+            fallbacks = self._batch_simple_sentiment([item.get("text", "") for item in missing])
+            parsed_results.extend(
+                {**item, **fallback, "batch_processed": False}
+                for item, fallback in zip(missing, fallbacks)
+            )
             
             return parsed_results
             
         except Exception as e:
-            logger.error(f"Error parsing batch sentiment results: {str(e)}")
+            logger.error("Error parsing batch sentiment results: %s", e)
             # Return fallback results
+            fallbacks = self._batch_simple_sentiment([item.get("text", "") for item in batch])
             return [
-                {
-                    **item,
-                    **self._simple_sentiment_analysis(item.get("text", "")),
-                    "batch_processed": False
-                }
-                for item in batch
+                {**item, **fallback, "batch_processed": False}
+                for item, fallback in zip(batch, fallbacks)
             ]
     
-    def _calculate_optimization_score(self, analytics: Dict[str, Any]) -> int:
+    def _calculate_optimization_score(self, profile: UsageProfile) -> int:
         """Calculate optimization score (0-100)"""
         score = 100
         
         # Deduct points for low cache hit rate
-        cache_rate = analytics.get("cache_hit_rate", 0)
-        if cache_rate < 0.3:
+        if profile.cache_hit_rate < 0.3:
             score -= 30
-        elif cache_rate < 0.5:
+        elif profile.cache_hit_rate < 0.5:
             score -= 15
         
         # Deduct points for high token usage
-        daily_avg = analytics.get("total_tokens", 0) / max(1, len(analytics.get("daily_breakdown", {})))
-        if daily_avg > self.token_optimizer.budget.daily_limit * 0.8:
+        daily_limit = self.token_optimizer.budget.daily_limit
+        if profile.daily_avg_tokens > daily_limit * 0.8:
             score -= 25
-        elif daily_avg > self.token_optimizer.budget.daily_limit * 0.6:
+        elif profile.daily_avg_tokens > daily_limit * 0.6:
             score -= 10
         
         # Deduct points for inefficient usage patterns
-        type_breakdown = analytics.get("type_breakdown", {})
-        if type_breakdown.get("sentiment_analysis", {}).get("tokens", 0) > analytics.get("total_tokens", 1) * 0.6:
+        if profile.sentiment_share > 0.6:
             score -= 20
         
         return max(0, score)
     
     def _generate_recommendations(
         self, 
-        analytics: Dict[str, Any], 
+        profile: UsageProfile, 
+        score: int,
         suggestions: List[Dict[str, Any]]
     ) -> List[str]:
         """Generate actionable recommendations"""
         recommendations = []
         
         # Based on optimization score
-        score = self._calculate_optimization_score(analytics)
-        
         if score < 50:
             recommendations.append("Implement response caching to reduce redundant LLM calls")
             recommendations.append("Use batch processing for sentiment analysis")
@@ -588,12 +840,11 @@ class EnhancedLLMOrchestrator(BaseOrchestrator):
             recommendations.append("Implement smarter context compression")
         
         # Based on specific usage patterns
-        cache_rate = analytics.get("cache_hit_rate", 0)
-        if cache_rate < 0.3:
+        if profile.cache_hit_rate < 0.3:
             recommendations.append("Standardize prompt formats to improve cache hit rates")
         
         # Add suggestions from the optimizer
         for suggestion in suggestions[:3]:  # Top 3 suggestions
-            recommendations.append(suggestion.get("description", ""))
+            recommendations.append(suggestion.get("recommendation", ""))
         
         return recommendations[:5]  # Limit to top 5 recommendations 
\ No newline at end of file
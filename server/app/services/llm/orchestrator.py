@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
 import json
 import asyncio
 from datetime import datetime
@@ -7,7 +7,8 @@ from ...core.config import get_settings
 from ...core.logging import get_logger
 from ...db.vectordb import VectorDB
 from .prompt_templates import PromptTemplates
-from .cot_engine import CoTEngine
+from .cot_engine import get_cot_engine
+from .response_cache import reasoning_cache
 from .action_tools import ActionTools
 from openai import AsyncOpenAI
 from ...services.optimization.token_optimizer import TokenOptimizer, TokenUsageRecord, PromptType
@@ -15,6 +16,28 @@ from ...services.optimization.token_optimizer import TokenOptimizer, TokenUsageR
 logger = get_logger("services.llm.orchestrator")
 settings = get_settings()
 
+# Fire-and-forget tasks (e.g. usage recording), referenced until done so they aren't garbage collected
+_background_tasks: Set[asyncio.Task] = set()
+
+def _on_background_task_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task failed: %s", task.exception())
+
+def _run_in_background(coro) -> asyncio.Task:
+    """Run a coroutine without waiting for it"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
+def _output_is_json_object(cot_result: Dict[str, Any]) -> bool:
+    """Whether a CoT result's output parses as the JSON object an analysis expects"""
+    try:
+        return isinstance(json.loads(cot_result.get("output", "")), dict)
+    except (TypeError, ValueError):
+        return False
+
 class LLMOrchestrator:
     """
     Main orchestrator for LLM interactions, manages the flow of Chain-of-Thought (CoT) reasoning
@@ -22,7 +45,7 @@ class LLMOrchestrator:
     """
     
     def __init__(self):
-        self.cot_engine = CoTEngine()
+        self.cot_engine = get_cot_engine()
         self.prompt_templates = PromptTemplates()
         self.action_tools = ActionTools()
         self.vector_db = VectorDB()
@@ -103,19 +126,24 @@ class LLMOrchestrator:
                 retrieved_knowledge
             )
             
-            # Send to LLM with CoT reasoning
-            cot_result = await self.cot_engine.generate_with_reasoning(prompt)
+            # Send to LLM with CoT reasoning, unless an equivalent exchange was answered recently
+            cot_result, response_cached = await self._generate_with_reasoning_cached(
+                self._reasoning_cache_namespace("survey_generation", survey, question),
+                "\n".join(msg.get("text", "") for msg in conversation_history[-5:]),
+                prompt
+            )
             
             # Extract the final question text from CoT reasoning
             question_text = cot_result.get("output", question["voice_prompt"])
             
-            # Track usage
-            await self._track_usage(
-                PromptType.QUESTION_GENERATION,
-                prompt,
-                question_text,
-                user_id
-            )
+            # Track usage (a cached result costs no tokens)
+            if not response_cached:
+                await self._track_usage(
+                    PromptType.QUESTION_GENERATION,
+                    prompt,
+                    question_text,
+                    user_id
+                )
             
             return {
                 "text": question_text,
@@ -171,8 +199,16 @@ class LLMOrchestrator:
                 retrieved_knowledge
             )
             
-            # Send to LLM with CoT reasoning
-            cot_result = await self.cot_engine.generate_with_reasoning(prompt)
+            # Send to LLM with CoT reasoning, reusing the analysis of an identical response. Similar
+            # responses can differ in sentiment ("satisfied" vs "not really satisfied"), so only exact
+            # matches count. The branching condition below is still derived from this response
+            cot_result, response_cached = await self._generate_with_reasoning_cached(
+                self._reasoning_cache_namespace("sentiment_analysis", survey, question),
+                response,
+                prompt,
+                semantic=False,
+                cacheable=_output_is_json_object
+            )
             
             # Extract structured analysis from the CoT result
             analysis_str = cot_result.get("output", "{}")
@@ -230,13 +266,14 @@ class LLMOrchestrator:
                 
                 analysis["condition"] = best_match
             
-            # Track usage
-            await self._track_usage(
-                PromptType.RESPONSE_ANALYSIS,
-                prompt,
-                json.dumps(analysis),
-                user_id
-            )
+            # Track usage (a cached result costs no tokens)
+            if not response_cached:
+                await self._track_usage(
+                    PromptType.RESPONSE_ANALYSIS,
+                    prompt,
+                    json.dumps(analysis),
+                    user_id
+                )
             
             return analysis
             
@@ -370,6 +407,53 @@ This should acknowledge what they said and ask for more information in a convers
         
         return flow_text
 
+    def _reasoning_cache_namespace(self, request_type: str, survey: Dict[str, Any], question: Dict[str, Any]) -> str:
+        """
+        Reasoning cache partition for a request type and question. It includes the survey's
+        last update, so editing a survey stops its cached results from matching.
+        """
+        survey_id = survey.get("_id", survey.get("id"))
+        return f"{request_type}:{survey_id}@{survey.get('updated_at', '')}:{question.get('id')}"
+    
+    async def _generate_with_reasoning_cached(
+        self,
+        namespace: str,
+        cache_text: str,
+        prompt: str,
+        cached_context: Optional[List[str]] = None,
+        stop_at_json_output: bool = False,
+        semantic: bool = True,
+        cacheable: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Generate a CoT result through the reasoning cache
+        
+        Args:
+            namespace: Cache partition, so only results for the same request type and question can match
+            cache_text: The varying input the result depends on, matched exactly or by embedding similarity
+            prompt: Prompt to send on a cache miss
+            cached_context: Static context blocks sent ahead of the prompt for provider prompt caching
+            stop_at_json_output: Stop reading the response once its final output is a complete JSON object
+            semantic: Whether a similar (not just identical) cache_text may match
+            cacheable: Check a fresh result must pass to be cached, so a malformed one isn't replayed
+            
+        Returns:
+            Tuple: The CoT result and whether it came from the cache
+        """
+        # Lookups and stores may embed text, so keep them off the event loop
+        cached = await asyncio.to_thread(reasoning_cache.get, namespace, cache_text, semantic)
+        if cached is not None:
+            return cached, True
+        
+        cot_result = await self.cot_engine.generate_with_reasoning(
+            prompt,
+            cached_context=cached_context,
+            stop_at_json_output=stop_at_json_output
+        )
+        if cacheable is None or cacheable(cot_result):
+            _run_in_background(asyncio.to_thread(reasoning_cache.put, namespace, cache_text, cot_result, semantic))
+        return cot_result, False
+    
     async def _track_usage(self, 
                           prompt_type: PromptType, 
                           input_text: str, 
@@ -1,9 +1,28 @@
-from typing import Dict, Any, List, Optional
+import functools
+import json
+from typing import Dict, Any, List, Optional, Tuple
 from string import Template
 
 class PromptTemplates:
     """Templates for LLM prompts with Chain-of-Thought reasoning"""
     
+    # Task instructions are identical for every question/response, so callers that support
+    # prompt caching can send them separately as a static prefix
+    SURVEY_QUESTION_INSTRUCTIONS = """Your task is to:
+1. First, review the conversation history to understand the context.
+2. Use Chain-of-Thought reasoning to plan how to ask this question naturally.
+3. Consider any relevant knowledge from the retrieved information.
+4. Formulate a conversational way to ask the question that flows from the previous exchange.
+5. Be prepared to clarify if the customer seems confused."""
+    
+    RESPONSE_ANALYSIS_INSTRUCTIONS = """Your task is to:
+1. Use Chain-of-Thought reasoning to analyze the customer's response.
+2. Determine if the response directly answers the question.
+3. Extract key information and sentiment from the response.
+4. Decide whether follow-up is needed for clarification.
+5. Identify any new topics or concerns the customer has introduced.
+6. Classify the response according to relevant categories."""
+    
     @staticmethod
     def survey_system_prompt(survey_info: Dict[str, Any]) -> str:
         """Generate system prompt for survey conversations"""
@@ -48,10 +67,67 @@ ${survey_flow}
     def survey_question_prompt(
         question: Dict[str, Any],
         conversation_history: List[Dict[str, Any]],
+        retrieved_knowledge: Optional[List[Dict[str, Any]]] = None,
+        include_instructions: bool = True
+    ) -> str:
+        """
+        Generate a prompt for asking a survey question with CoT reasoning.
+        With include_instructions=False the task instructions are left out, to be sent
+        separately (see SURVEY_QUESTION_INSTRUCTIONS).
+        """
+        return _render_survey_question_prompt(
+            question.get("text", ""),
+            question.get("type", "open_ended"),
+            question.get("id", "unknown"),
+            _history_key(conversation_history),
+            _knowledge_key(retrieved_knowledge),
+            include_instructions
+        )
+    
+    @staticmethod
+    def response_analysis_prompt(
+        question: Dict[str, Any],
+        customer_response: str,
+        conversation_history: List[Dict[str, Any]],
+        retrieved_knowledge: Optional[List[Dict[str, Any]]] = None,
+        include_instructions: bool = True
+    ) -> str:
+        """
+        Generate a prompt for analyzing customer responses with CoT reasoning.
+        With include_instructions=False the task instructions are left out, to be sent
+        separately (see RESPONSE_ANALYSIS_INSTRUCTIONS).
+        """
+        return _render_response_analysis_prompt(
+            question.get("text", ""),
+            customer_response,
+            question.get("type", "open_ended"),
+            question.get("id", "unknown"),
+            _history_key(conversation_history),
+            _knowledge_key(retrieved_knowledge),
+            include_instructions
+        )
+    
+    @staticmethod
+    def follow_up_prompt(
+        question: Dict[str, Any],
+        customer_response: str,
+        analysis: Dict[str, Any],
+        conversation_history: List[Dict[str, Any]],
         retrieved_knowledge: Optional[List[Dict[str, Any]]] = None
     ) -> str:
-        """Generate a prompt for asking a survey question with CoT reasoning"""
-        template = Template("""
+        """Generate a prompt for a follow-up response or clarification question"""
+        return _FOLLOW_UP_TEMPLATE.substitute(
+            question_text=question.get("text", ""),
+            customer_response=customer_response,
+            analysis=json.dumps(analysis, default=str),
+            conversation_history=_format_history(_history_key(conversation_history)),
+            knowledge_section=_format_knowledge(
+                _knowledge_key(retrieved_knowledge),
+                "No relevant knowledge retrieved for this follow-up."
+            )
+        )
+
+_SURVEY_QUESTION_TEMPLATE = Template("""
 Question to ask: "${question_text}"
 Question Type: ${question_type}
 Question ID: ${question_id}
@@ -61,48 +137,12 @@ ${conversation_history}
 
 ${knowledge_section}
 
-Your task is to:
-1. First, review the conversation history to understand the context.
-2. Use Chain-of-Thought reasoning to plan how to ask this question naturally.
-3. Consider any relevant knowledge from the retrieved information.
-4. Formulate a conversational way to ask the question that flows from the previous exchange.
-5. Be prepared to clarify if the customer seems confused.
+${instructions}
 
 Chain-of-Thought Reasoning:
 """)
-        
-        # Format conversation history
-        history_text = ""
-        for entry in conversation_history[-5:]:  # Only include the last 5 exchanges
-            speaker = "AI" if entry.get("is_ai", False) else "Customer"
-            history_text += f"{speaker}: {entry.get('text', '')}\n"
-        
-        # Format knowledge section if provided
-        knowledge_text = ""
-        if retrieved_knowledge:
-            knowledge_text = "Retrieved Knowledge:\n"
-            for item in retrieved_knowledge:
-                knowledge_text += f"- {item.get('text', '')[:200]}...\n"
-        
-        knowledge_section = knowledge_text if knowledge_text else "No relevant knowledge retrieved for this question."
-        
-        return template.substitute(
-            question_text=question.get("text", ""),
-            question_type=question.get("type", "open_ended"),
-            question_id=question.get("id", "unknown"),
-            conversation_history=history_text,
-            knowledge_section=knowledge_section
-        )
-    
-    @staticmethod
-    def response_analysis_prompt(
-        question: Dict[str, Any],
-        customer_response: str,
-        conversation_history: List[Dict[str, Any]],
-        retrieved_knowledge: Optional[List[Dict[str, Any]]] = None
-    ) -> str:
-        """Generate a prompt for analyzing customer responses with CoT reasoning"""
-        template = Template("""
+
+_RESPONSE_ANALYSIS_TEMPLATE = Template("""
 Customer's response to question "${question_text}": "${customer_response}"
 Question Type: ${question_type}
 Question ID: ${question_id}
@@ -112,37 +152,77 @@ ${conversation_history}
 
 ${knowledge_section}
 
-Your task is to:
-1. Use Chain-of-Thought reasoning to analyze the customer's response.
-2. Determine if the response directly answers the question.
-3. Extract key information and sentiment from the response.
-4. Decide whether follow-up is needed for clarification.
-5. Identify any new topics or concerns the customer has introduced.
-6. Classify the response according to relevant categories.
+${instructions}
 
 Chain-of-Thought Reasoning:
 """)
-        
-        # Format conversation history
-        history_text = ""
-        for entry in conversation_history[-5:]:  # Only include the last 5 exchanges
-            speaker = "AI" if entry.get("is_ai", False) else "Customer"
-            history_text += f"{speaker}: {entry.get('text', '')}\n"
-        
-        # Format knowledge section if provided
-        knowledge_text = ""
-        if retrieved_knowledge:
-            knowledge_text = "Retrieved Knowledge:\n"
-            for item in retrieved_knowledge:
-                knowledge_text += f"- {item.get('text', '')[:200]}...\n"
-        
-        knowledge_section = knowledge_text if knowledge_text else "No relevant knowledge retrieved for this analysis."
-        
-        return template.substitute(
-            question_text=question.get("text", ""),
-            customer_response=customer_response,
-            question_type=question.get("type", "open_ended"),
-            question_id=question.get("id", "unknown"),
-            conversation_history=history_text,
-            knowledge_section=knowledge_section
-        )
\ No newline at end of file
+
+_FOLLOW_UP_TEMPLATE = Template("""
+Customer's response to question "${question_text}": "${customer_response}"
+Our analysis of the response: ${analysis}
+
+Conversation Context:
+${conversation_history}
+
+${knowledge_section}
+
+Generate a brief, natural follow-up response or clarification question.
+This should acknowledge what they said and ask for more information in a conversational way.
+""")
+
+# Adjacent turns often render the same question with the same history and knowledge, so renders
+# are cached by the content they use: (is_ai, text) of the last 5 exchanges and each knowledge snippet
+def _history_key(conversation_history: List[Dict[str, Any]]) -> Tuple[Tuple[bool, str], ...]:
+    return tuple(
+        (bool(entry.get("is_ai", False)), entry.get("text", ""))
+        for entry in conversation_history[-5:]  # Only include the last 5 exchanges
+    )
+
+def _knowledge_key(retrieved_knowledge: Optional[List[Dict[str, Any]]]) -> Tuple[str, ...]:
+    return tuple(item.get("text", "")[:200] for item in retrieved_knowledge or ())
+
+def _format_history(history: Tuple[Tuple[bool, str], ...]) -> str:
+    return "".join(f"{'AI' if is_ai else 'Customer'}: {text}\n" for is_ai, text in history)
+
+def _format_knowledge(knowledge: Tuple[str, ...], empty_message: str) -> str:
+    if not knowledge:
+        return empty_message
+    return "Retrieved Knowledge:\n" + "".join(f"- {snippet}...\n" for snippet in knowledge)
+
+@functools.lru_cache(maxsize=2048)
+def _render_survey_question_prompt(
+    question_text: str,
+    question_type: str,
+    question_id: Any,
+    history: Tuple[Tuple[bool, str], ...],
+    knowledge: Tuple[str, ...],
+    include_instructions: bool
+) -> str:
+    return _SURVEY_QUESTION_TEMPLATE.substitute(
+        question_text=question_text,
+        question_type=question_type,
+        question_id=question_id,
+        conversation_history=_format_history(history),
+        knowledge_section=_format_knowledge(knowledge, "No relevant knowledge retrieved for this question."),
+        instructions=PromptTemplates.SURVEY_QUESTION_INSTRUCTIONS if include_instructions else ""
+    )
+
+@functools.lru_cache(maxsize=2048)
+def _render_response_analysis_prompt(
+    question_text: str,
+    customer_response: str,
+    question_type: str,
+    question_id: Any,
+    history: Tuple[Tuple[bool, str], ...],
+    knowledge: Tuple[str, ...],
+    include_instructions: bool
+) -> str:
+    return _RESPONSE_ANALYSIS_TEMPLATE.substitute(
+        question_text=question_text,
+        customer_response=customer_response,
+        question_type=question_type,
+        question_id=question_id,
+        conversation_history=_format_history(history),
+        knowledge_section=_format_knowledge(knowledge, "No relevant knowledge retrieved for this analysis."),
+        instructions=PromptTemplates.RESPONSE_ANALYSIS_INSTRUCTIONS if include_instructions else ""
+    )
\ No newline at end of file
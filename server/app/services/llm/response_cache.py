@@ -0,0 +1,142 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Union
+
+import numpy as np
+
+from ...core.config import get_settings
+from ...core.logging import get_logger
+
+logger = get_logger("services.llm.response_cache")
+settings = get_settings()
+
+class LLMResponseCache:
+    """
+    Two-tier cache for LLM results, partitioned by namespace (e.g. a schema key).
+    Exact lookups are keyed by (namespace, normalized text); when enabled, a semantic
+    lookup returns the result of a near-identical text in the same namespace.
+    """
+    
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        semantic_threshold: Optional[float] = None
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self._exact: OrderedDict = OrderedDict()  # key -> (expires_at, result)
+        self._semantic: Dict[str, List[tuple]] = {}  # namespace -> [(expires_at, embedding, result)]
+        self._embedding_generator = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def schema_key(schema: Union[str, Dict[str, Any]]) -> str:
+        """Stable key for a schema, so hits require the exact same schema"""
+        schema_str = json.dumps(schema, sort_keys=True) if isinstance(schema, dict) else str(schema)
+        return hashlib.blake2b(schema_str.encode("utf-8"), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        return " ".join(text.lower().split())
+    
+    def get(self, namespace: str, text: str, semantic: bool = True) -> Optional[Dict[str, Any]]:
+        """Return a cached result for this namespace and text, or None (exact matches only if not semantic)"""
+        normalized = self.normalize_text(text)
+        key = self._exact_key(namespace, normalized)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._exact.move_to_end(key)
+                    return copy.deepcopy(result)
+                del self._exact[key]
+        
+        if self.semantic_threshold is None or not semantic:
+            return None
+        
+        return self._get_semantic(namespace, normalized, now)
+    
+    def put(self, namespace: str, text: str, result: Dict[str, Any], semantic: bool = True):
+        """Cache a successfully parsed result (for exact lookups only if not semantic)"""
+        normalized = self.normalize_text(text)
+        expires_at = time.monotonic() + self.ttl_seconds
+        result = copy.deepcopy(result)
+        
+        with self._lock:
+            self._exact[self._exact_key(namespace, normalized)] = (expires_at, result)
+            while len(self._exact) > self.max_size:
+                self._exact.popitem(last=False)
+        
+        if self.semantic_threshold is not None and semantic:
+            embedding = self._embed(normalized)
+            if embedding is not None:
+                with self._lock:
+                    entries = self._semantic.setdefault(namespace, [])
+                    entries.append((expires_at, embedding, result))
+                    if len(entries) > self.max_size:
+                        del entries[:len(entries) - self.max_size]
+    
+    def _get_semantic(self, namespace: str, normalized: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = [entry for entry in self._semantic.get(namespace, []) if entry[0] > now]
+            self._semantic[namespace] = entries
+        
+        if not entries:
+            return None
+        
+        embedding = self._embed(normalized)
+        if embedding is None:
+            return None
+        
+        # Embeddings are unit-normalized, so the dot product is the cosine similarity
+        similarities = np.stack([entry[1] for entry in entries]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.semantic_threshold:
+            return None
+        
+        logger.debug(f"Semantic cache hit (similarity {similarities[best]:.3f})")
+        return copy.deepcopy(entries[best][2])
+    
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        try:
+            if self._embedding_generator is None:
+                from ..document_processor.embedding_generator import EmbeddingGenerator
+                self._embedding_generator = EmbeddingGenerator()
+            
+            embedding = np.asarray(self._embedding_generator.generate_embeddings([text])[0], dtype=np.float32)
+            norm = np.linalg.norm(embedding)
+            return embedding / norm if norm else None
+        except Exception as e:
+            logger.warning(f"Could not embed text for semantic cache: {e}")
+            return None
+    
+    @staticmethod
+    def _exact_key(namespace: str, normalized: str) -> str:
+        return hashlib.blake2b(
+            namespace.encode("utf-8") + b"|" + normalized.encode("utf-8"),
+            digest_size=16
+        ).hexdigest()
+
+# Process-wide cache in front of CoTEngine.generate_structured_output
+structured_output_cache = LLMResponseCache(
+    max_size=settings.LLM_RESPONSE_CACHE_SIZE,
+    ttl_seconds=settings.LLM_RESPONSE_CACHE_TTL_SECONDS,
+    semantic_threshold=settings.LLM_SEMANTIC_CACHE_THRESHOLD if settings.LLM_SEMANTIC_CACHE_ENABLED else None
+)
+
+# Process-wide cache of CoT results for the orchestrators' question and analysis prompts,
+# namespaced per question so only paraphrases of the same exchange can match
+reasoning_cache = LLMResponseCache(
+    max_size=settings.LLM_RESPONSE_CACHE_SIZE,
+    ttl_seconds=settings.LLM_REASONING_CACHE_TTL_SECONDS,
+    semantic_threshold=settings.LLM_REASONING_CACHE_THRESHOLD if settings.LLM_REASONING_CACHE_ENABLED else None
+)
@@ -11,7 +11,6 @@ import base64
 import hmac
 import hashlib
 import requests
-import os
 
 import vonage
 from vonage import VonageError
@@ -106,7 +105,7 @@ class NexmoWhatsAppService:
         
         try:
             # Use environment variable for API URL
-            api_url = os.getenv("NEXMO_MESSAGES_API_URL", "https://messages-sandbox.nexmo.com/v1/messages")
+            api_url = self.settings.NEXMO_MESSAGES_API_URL
             
             headers = {
                 "Authorization": f"Bearer {self.jwt}",
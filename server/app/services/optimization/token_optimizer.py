@@ -2,18 +2,39 @@
 Token Optimization Service for OpenAI API Cost Reduction
 """
 import logging
+import functools
 import hashlib
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple
 from enum import Enum
 from dataclasses import dataclass
 import asyncio
+from pymongo import ReturnDocument
 
 from ...db.mongodb import MongoDB
 
 logger = logging.getLogger(__name__)
 
+@functools.cache
+def _token_encoding():
+    # tiktoken is optional (and may need to download the encoding); without it, estimate from length
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating token counts from text length: {e}")
+        return None
+
+@functools.lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Count BPE tokens in text, cached since the same questions and turns are counted repeatedly"""
+    encoding = _token_encoding()
+    if encoding is None:
+        # Rough estimation: ~4 characters per token
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
 class PromptType(str, Enum):
     SURVEY_GENERATION = "survey_generation"
     FOLLOW_UP_GENERATION = "follow_up_generation"
@@ -49,9 +70,10 @@ class TokenOptimizer:
     def __init__(self, budget: TokenBudget = None):
         self.budget = budget or TokenBudget()
         self.optimization_cache = {}
+        self._seeded_budget_counters: Set[str] = set()
         
-    async def optimize_prompt(self, prompt: str, prompt_type: PromptType, context: Dict = None) -> str:
-        """Optimize a prompt to reduce token consumption"""
+    async def optimize_prompt(self, prompt: str, prompt_type: PromptType, context: Dict = None) -> Tuple[str, int]:
+        """Optimize a prompt to reduce token consumption, returning it with its token count"""
         try:
             # Simple optimization strategies
             optimized = prompt
@@ -66,14 +88,14 @@ class TokenOptimizer:
                 optimized = self._optimize_analysis_prompt(optimized)
             
             # Cache the optimization
-            cache_key = hashlib.md5(prompt.encode()).hexdigest()
+            cache_key = self._generate_prompt_hash(prompt)
             self.optimization_cache[cache_key] = optimized
             
-            return optimized
+            return optimized, count_tokens(optimized)
             
         except Exception as e:
             logger.error(f"Error optimizing prompt: {e}")
-            return prompt
+            return prompt, count_tokens(prompt)
     
     def _optimize_question_prompt(self, prompt: str) -> str:
         """Optimize question generation prompts"""
@@ -152,8 +174,121 @@ class TokenOptimizer:
             logger.error(f"Error checking budget: {e}")
             return {"within_budget": True, "error": str(e)}
     
-    async def record_usage(self, usage_record: TokenUsageRecord) -> None:
-        """Record token usage in MongoDB"""
+    async def check_and_reserve(self, user_id: str, estimated_tokens: int, request_type: str) -> Tuple[bool, str]:
+        """
+        Check the budget and reserve the estimated tokens in one atomic update.
+        Usage is counted in a per-user, per-month token_budgets document, so an allowed
+        request costs a single round trip; a denied reservation is rolled back.
+        """
+        if estimated_tokens > self.budget.per_request_limit:
+            return False, f"Request exceeds per-request limit ({estimated_tokens} > {self.budget.per_request_limit})"
+        
+        try:
+            collection = MongoDB.get_collection("token_budgets")
+            now = datetime.utcnow()
+            counter_id = f"{user_id}:{now:%Y-%m}"
+            day_key = f"{now.day:02d}"
+            await self._seed_budget_counter(collection, user_id, counter_id, now)
+            increment = {
+                "monthly_total": estimated_tokens,
+                f"daily.{day_key}": estimated_tokens,
+                f"by_type.{request_type}": estimated_tokens
+            }
+            
+            counters = await collection.find_one_and_update(
+                {"_id": counter_id},
+                {"$inc": increment, "$set": {"user_id": user_id, "updated_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            
+            if counters["daily"][day_key] > self.budget.daily_limit:
+                reason = f"Daily token limit exceeded ({self.budget.daily_limit})"
+            elif counters["monthly_total"] > self.budget.monthly_limit:
+                reason = f"Monthly token limit exceeded ({self.budget.monthly_limit})"
+            else:
+                return True, "Within budget"
+            
+            await collection.update_one(
+                {"_id": counter_id},
+                {"$inc": {field: -tokens for field, tokens in increment.items()}}
+            )
+            return False, reason
+            
+        except Exception as e:
+            logger.error(f"Error reserving token budget: {e}")
+            return True, f"Budget check unavailable: {e}"
+    
+    async def _seed_budget_counter(self, collection, user_id: str, counter_id: str, now: datetime) -> None:
+        """
+        Create this month's budget counter from the usage already recorded in token_usage,
+        so the limits also cover usage from before the counter existed. Checked once per
+        counter per process; an existing counter is left as it is.
+        """
+        if counter_id in self._seeded_budget_counters:
+            return
+        
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        daily: Dict[str, int] = {}
+        by_type: Dict[str, int] = {}
+        
+        async for group in MongoDB.get_collection("token_usage").aggregate([
+            {"$match": {"user_id": user_id, "timestamp": {"$gte": month_start}}},
+            {"$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%d", "date": "$timestamp"}},
+                    "type": "$prompt_type"
+                },
+                "tokens": {"$sum": "$total_tokens"}
+            }}
+        ]):
+            day, request_type = group["_id"]["day"], group["_id"]["type"]
+            daily[day] = daily.get(day, 0) + group["tokens"]
+            by_type[request_type] = by_type.get(request_type, 0) + group["tokens"]
+        
+        await collection.update_one(
+            {"_id": counter_id},
+            {"$setOnInsert": {
+                "user_id": user_id,
+                "monthly_total": sum(daily.values()),
+                "daily": daily,
+                "by_type": by_type
+            }},
+            upsert=True
+        )
+        self._seeded_budget_counters.add(counter_id)
+    
+    async def reconcile_reservation(
+        self,
+        user_id: str,
+        request_type: str,
+        reserved_tokens: int,
+        actual_tokens: int
+    ) -> None:
+        """
+        Correct the budget counters by the difference between the tokens a request actually
+        used (input and output) and the estimate check_and_reserve charged for it
+        """
+        difference = actual_tokens - reserved_tokens
+        if difference == 0:
+            return
+        
+        try:
+            now = datetime.utcnow()
+            # No upsert: a counter created later is seeded from token_usage, which includes this usage
+            await MongoDB.get_collection("token_budgets").update_one(
+                {"_id": f"{user_id}:{now:%Y-%m}"},
+                {"$inc": {
+                    "monthly_total": difference,
+                    f"daily.{now.day:02d}": difference,
+                    f"by_type.{request_type}": difference
+                }}
+            )
+        except Exception as e:
+            logger.error(f"Error reconciling token budget: {e}")
+    
+    async def record_usage(self, usage_record: TokenUsageRecord, reserved_tokens: int = 0) -> None:
+        """Record token usage in MongoDB and count it toward the budget (less any reserved tokens)"""
         try:
             collection = MongoDB.get_collection("token_usage")
             await collection.insert_one({
@@ -169,6 +304,52 @@ class TokenOptimizer:
             
         except Exception as e:
             logger.error(f"Error recording usage: {e}")
+        
+        await self.reconcile_reservation(
+            usage_record.user_id,
+            usage_record.prompt_type.value,
+            reserved_tokens,
+            usage_record.total_tokens
+        )
+    
+    async def record_token_usage(
+        self,
+        user_id: str,
+        request_type: str,
+        tokens_used: int,
+        prompt_hash: Optional[str] = None,
+        response_cached: bool = False,
+        reserved_tokens: int = 0,
+        **usage_details: int
+    ) -> None:
+        """
+        Record a request's actual token usage and reconcile its budget reservation
+        
+        Args:
+            user_id: User the tokens are charged to
+            request_type: Request type the usage (and reservation) is recorded under
+            tokens_used: Actual input plus output tokens (0 for a cached response)
+            prompt_hash: Hash identifying the prompt
+            response_cached: Whether the response came from a cache
+            reserved_tokens: Tokens check_and_reserve charged for the request
+            usage_details: Extra token counts to store, e.g. prompt cache reads and writes
+        """
+        try:
+            await MongoDB.get_collection("token_usage").insert_one({
+                "timestamp": datetime.utcnow(),
+                "prompt_type": request_type,
+                "total_tokens": tokens_used,
+                "cost": tokens_used / 1000 * self.budget.cost_per_1k_tokens,
+                "user_id": user_id,
+                "optimization_applied": response_cached,
+                "prompt_hash": prompt_hash,
+                **usage_details
+            })
+            
+        except Exception as e:
+            logger.error(f"Error recording usage: {e}")
+        
+        await self.reconcile_reservation(user_id, request_type, reserved_tokens, tokens_used)
     
     async def get_usage_analytics(self, user_id: str, days: int = 7) -> Dict[str, Any]:
         """Get comprehensive usage analytics"""
@@ -265,9 +446,17 @@ class TokenOptimizer:
             return {"error": str(e)}
     
     def estimate_tokens(self, text: str) -> int:
-        """Simple token estimation (rough approximation)"""
-        # Rough estimation: ~4 characters per token
-        return max(1, len(text) // 4)
+        """Token count for text (exact with tiktoken, otherwise a rough approximation)"""
+        return count_tokens(text)
+    
+    def _generate_prompt_hash(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """Hash identifying a prompt and the context it was sent in (blake2b, faster than md5/sha256)"""
+        digest = hashlib.blake2b(digest_size=16)
+        if context:
+            digest.update(json.dumps(context, sort_keys=True, default=str).encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
     
     async def get_optimization_insights(self, user_id: str) -> List[Dict[str, Any]]:
         """Generate optimization recommendations"""
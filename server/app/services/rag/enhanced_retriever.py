@@ -3,7 +3,7 @@ Enhanced RAG Retriever for Optimized Token Consumption
 """
 import logging
 import json
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import asyncio
@@ -46,6 +46,71 @@ class RetrievalResult:
     compression_ratio: float = 0.0
     tokens_saved: int = 0
 
+class QueryEmbedBatcher:
+    """
+    Micro-batches query embeddings across concurrent retrievals. Queries that arrive within
+    window_seconds of the first pending one (up to max_batch_size) are embedded in a single call.
+    """
+    
+    def __init__(self, window_seconds: float, max_batch_size: int):
+        self.window_seconds = window_seconds
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self._embedding_generator = None
+    
+    async def embed(self, text: str) -> List[float]:
+        """Embed a query, batched with other queries arriving at about the same time"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_seconds, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._embed_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _embed_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        try:
+            if self._embedding_generator is None:
+                from ...services.document_processor.embedding_generator import EmbeddingGenerator
+                self._embedding_generator = EmbeddingGenerator()
+            
+            # Embedding backends are blocking, so the call runs off the event loop
+            embeddings = await asyncio.to_thread(
+                self._embedding_generator.generate_embeddings,
+                [text for text, _ in batch]
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+# Shared by all retrievers, so concurrent requests' queries are batched together
+query_embed_batcher = QueryEmbedBatcher(
+    window_seconds=settings.RAG_QUERY_BATCH_WINDOW_MS / 1000,
+    max_batch_size=settings.RAG_QUERY_BATCH_SIZE
+)
+
 class EnhancedRAGRetriever:
     """Enhanced RAG retriever with token optimization"""
     
@@ -163,8 +228,11 @@ class EnhancedRAGRetriever:
             
             logger.info(f"Querying documents with: {query}")
             
-            # Get documents
-            docs = await documents_collection.find(query).to_list(length=50)
+            # Get documents (only the fields needed to search and label results)
+            docs = await documents_collection.find(
+                query,
+                {"name": 1, "vector_collection_name": 1}
+            ).to_list(length=50)
             
             logger.info(f"Found {len(docs)} filtered documents for user {context.user_id}")
             
@@ -182,11 +250,8 @@ class EnhancedRAGRetriever:
     async def _search_document_collections(self, query: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Search across multiple document vector collections"""
         try:
-            from ...services.document_processor.embedding_generator import EmbeddingGenerator
-            
             # Generate query embedding
-            embedding_generator = EmbeddingGenerator()
-            query_embedding = embedding_generator.generate_embeddings([query])[0]
+            query_embedding = await query_embed_batcher.embed(query)
             
             all_results = []
             
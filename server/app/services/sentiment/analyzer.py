@@ -8,7 +8,7 @@ from enum import Enum
 
 from ...core.config import get_settings
 from ...core.logging import get_logger
-from ..llm.cot_engine import CoTEngine
+from ..llm.cot_engine import get_cot_engine
 
 logger = get_logger("services.sentiment.analyzer")
 settings = get_settings()
@@ -30,7 +30,7 @@ class SentimentAnalyzer:
     
     def __init__(self):
         """Initialize sentiment analyzer"""
-        self.llm_engine = CoTEngine()
+        self.llm_engine = get_cot_engine()
     
     async def analyze_text(
         self, 
@@ -7,7 +7,6 @@ import hashlib
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional, Union
-import os
 from dotenv import load_dotenv
 
 from ...core.config import get_settings
@@ -247,7 +246,7 @@ class TwilioConnector:
         Returns:
             str: TwiML XML string
         """
-        webhook_base_url = os.getenv("WEBHOOK_BASE_URL", "https://your-ngrok-url.ngrok.io")
+        webhook_base_url = settings.WEBHOOK_BASE_URL
         
         response = VoiceResponse()
         
@@ -291,7 +290,7 @@ class TwilioConnector:
         Returns:
             str: TwiML XML string
         """
-        webhook_base_url = os.getenv("WEBHOOK_BASE_URL", "https://your-ngrok-url.ngrok.io")
+        webhook_base_url = settings.WEBHOOK_BASE_URL
         
         response = VoiceResponse()
         
@@ -429,7 +428,7 @@ class TwilioConnector:
 def create_survey_twiml(survey, webhook_base_url=None):
     """Generate TwiML for survey questions"""
     if webhook_base_url is None:
-        webhook_base_url = os.getenv("WEBHOOK_BASE_URL", "https://your-ngrok-url.ngrok.io")
+        webhook_base_url = settings.WEBHOOK_BASE_URL
     
     # ... existing code ...
     